@@ -5,30 +5,33 @@ AI模块
 提供AI分析、模型训练和文本改写功能
 """
 
-try:
-    from .analyzers.ai_analyzer import (
-        AIAnalyzerBase,
-        OpenAIAnalyzer,
-        LocalLLMAnalyzer,
-        TensorFlowAnalyzer,
-        AIAnalyzerFactory
-    )
-except ImportError:
-    # 如果导入失败，设置为None
-    AIAnalyzerBase = None
-    OpenAIAnalyzer = None
-    LocalLLMAnalyzer = None
-    TensorFlowAnalyzer = None
-    AIAnalyzerFactory = None
+import importlib
+
+# 导出名称 -> (模块, 属性名)，首次访问时才导入，避免导入本包就加载openai、tensorflow等依赖
+_LAZY_IMPORTS = {
+    'AIAnalyzerBase': ('.analyzers.ai_analyzer', 'AIAnalyzerBase'),
+    'OpenAIAnalyzer': ('.analyzers.ai_analyzer', 'OpenAIAnalyzer'),
+    'LocalLLMAnalyzer': ('.analyzers.ai_analyzer', 'LocalLLMAnalyzer'),
+    'TensorFlowAnalyzer': ('.models.tensorflow_model', 'TensorFlowAnalyzer'),
+    'AIAnalyzerFactory': ('.analyzers.ai_analyzer', 'AIAnalyzerFactory'),
+    'TensorFlowTextRewriter': ('.models.tensorflow_model', 'TensorFlowTextRewriter'),
+    'TensorFlowModelAnalyzer': ('.models.tensorflow_model', 'TensorFlowAnalyzer'),
+}
+
+
+def __getattr__(name):
+    """按需导入导出的类"""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_IMPORTS[name]
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except ImportError:
+        # 如果导入失败，设置为None
+        value = None
+    globals()[name] = value
+    return value
 
-try:
-    from .models.tensorflow_model import (
-        TensorFlowTextRewriter,
-        TensorFlowAnalyzer as TensorFlowModelAnalyzer
-    )
-except ImportError:
-    TensorFlowTextRewriter = None
-    TensorFlowModelAnalyzer = None
 
 __all__ = [
     'AIAnalyzerBase',
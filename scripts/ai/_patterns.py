@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享正则模块
+一致性检查器和上下文管理器共用的正则片段、构造函数和扫描工具
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import re2
+    _RE2_OPTIONS = re2.Options()
+    _RE2_OPTIONS.log_errors = False
+except ImportError:
+    re2 = None
+
+
+# 正则片段（两个模块的模式在此基础上增减词语）
+NAME = r'([\u4e00-\u9fa5]{2,3})'  # 2-3个中文字符的人名
+TURN_TRIGGERS = '突然|忽然|终于|最后|然后|接着|但是|然而'  # 转折类情节触发词
+DEVELOP_TRIGGERS = '发现|知道|明白|决定|开始|结束'  # 发展类情节触发词
+EMPHASIS_TRIGGERS = '重要|关键|转折|变化'  # 强调类触发词
+TIMELINE_MARKERS = r'第\d+天|第\d+章|第\d+次|后来|然后|接着|之后|之前'  # 时间线标记
+PLACE_WORDS = '都市|城市|乡村|小镇|学校|公司|医院|咖啡厅|餐厅'  # 地点设定词
+
+
+def name_action_re(verbs: str, suffix: str = ''):
+    """
+    "人名+动作词"的正则，group(1)为人名
+    
+    Args:
+        verbs: 动作词交替式（如 '说|道|想'）
+        suffix: 追加在动作词之后的模式（如前瞻断言）
+    """
+    return re.compile(f'{NAME}(?:{verbs}){suffix}')
+
+
+def trigger_sentence_re(triggers: str, max_len: int):
+    """
+    "触发词+10~max_len个字符+句末标点"的正则，group(1)为触发词
+    
+    Args:
+        triggers: 触发词交替式
+        max_len: 触发词与句末标点之间的最大字符数
+    """
+    return re.compile(f'({triggers})[^。！？]{{10,{max_len}}}[。！？]')
+
+
+def compile_linear(pattern: str):
+    """
+    编译需要线性时间匹配的正则（已安装google-re2时使用RE2，否则回退到re）
+    
+    适用于"[^。！？]*关键词"这类无界前缀的模式：re在没有句末标点的长文本上会退化为平方复杂度
+    """
+    if re2 is not None:
+        try:
+            return re2.compile(pattern, _RE2_OPTIONS)
+        except re2.error:
+            pass
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=32)
+def name_sentence_re(names: Tuple[str, ...], max_len: Optional[int] = None):
+    """
+    匹配"人名...句末标点"的正则（所有人名合并为一个交替式，只需扫描一遍文本）
+    
+    使用零宽前瞻，使同一句中出现的多个人名都能各自匹配到
+    """
+    alternation = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    body = '[^。！？]*' if max_len is None else f'[^。！？]{{0,{max_len}}}'
+    return re.compile(f'(?=({alternation})({body}[。！？]))')
+
+
+def sentences_by_name(text: str, names: List[str], max_len: Optional[int] = None,
+                       endpos: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    一次扫描找出每个人名所在的句子（与逐个人名调用 re.findall 的结果一致）
+    
+    Args:
+        text: 文本
+        names: 人名列表
+        max_len: 人名与句末标点之间的最大字符数（None表示不限）
+        endpos: 只扫描 text[:endpos]（直接传给finditer，不复制字符串）
+    
+    Returns:
+        人名 -> 句子列表
+    """
+    sentences = {name: [] for name in names}
+    if not names:
+        return sentences
+    # 交替式只会匹配最长的人名，同一位置上作为其前缀的较短人名也要记录
+    prefixes = {name: [other for other in names if other != name and name.startswith(other)] for name in names}
+    last_end = {}
+    if endpos is None:
+        endpos = len(text)
+    for match in name_sentence_re(tuple(names), max_len).finditer(text, 0, endpos):
+        start = match.start()
+        end = match.end(2)
+        matched = match.group(1)
+        for name in (matched, *prefixes[matched]):
+            # 同一人名的匹配互不重叠（与findall一致）
+            if start < last_end.get(name, 0):
+                continue
+            if max_len is not None and end - start - len(name) - 1 > max_len:
+                continue
+            sentences[name].append(text[start:end])
+            last_end[name] = end
+    return sentences
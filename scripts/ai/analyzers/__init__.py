@@ -4,13 +4,27 @@
 AI分析器模块
 """
 
-from .ai_analyzer import (
-    AIAnalyzerBase,
-    OpenAIAnalyzer,
-    LocalLLMAnalyzer,
-    TensorFlowAnalyzer,
-    AIAnalyzerFactory
-)
+import importlib
+
+# 导出名称 -> (模块, 属性名)，首次访问时才导入
+_LAZY_IMPORTS = {
+    'AIAnalyzerBase': ('.ai_analyzer', 'AIAnalyzerBase'),
+    'OpenAIAnalyzer': ('.ai_analyzer', 'OpenAIAnalyzer'),
+    'LocalLLMAnalyzer': ('.ai_analyzer', 'LocalLLMAnalyzer'),
+    'TensorFlowAnalyzer': ('..models.tensorflow_model', 'TensorFlowAnalyzer'),
+    'AIAnalyzerFactory': ('.ai_analyzer', 'AIAnalyzerFactory'),
+}
+
+
+def __getattr__(name):
+    """按需导入导出的类"""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     'AIAnalyzerBase',
@@ -7,10 +7,218 @@ AI分析器模块
 
 import os
 import json
+import hashlib
 import re
-from typing import Dict, List, Optional, Any
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from collections import Counter, deque
+from itertools import chain, islice
+from typing import Dict, List, Optional, Any, Iterable, Callable, Tuple
 from abc import ABC, abstractmethod
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import ahocorasick
+    _HAS_AC = True
+except ImportError:
+    _HAS_AC = False
+
+
+_openai = None
+
+
+def _lazy_openai():
+    """按需导入openai（首次创建OpenAIAnalyzer时才加载）"""
+    global _openai
+    if _openai is None:
+        import openai
+        _openai = openai
+    return _openai
+
+
+def _lazy_prompt_cache():
+    """按需导入缓存模块（依赖numpy，仅在启用缓存时加载）"""
+    try:
+        from . import prompt_cache
+    except ImportError:
+        try:
+            import prompt_cache
+        except ImportError:
+            return None
+    return prompt_cache
+
+
+# 预编译的正则表达式
+_CHAPTER_RE = re.compile(r'第\s*(\d+)\s*章[：:：]?\s*(.*?)\n')
+_STYLE_SPLIT_RE = re.compile(r'[+、，]')
+_LAST_SENT_END_RE = re.compile(r'[。！？](?=[^。！？]*$)')
+_LAST_SENT_TAIL_RE = re.compile(r'[。！？][”’」』"]*(?=[^。！？]*$)')  # 最后一个句末标点及其后的右引号
+
+@lru_cache(maxsize=16)
+def _system_messages(system_prompt: Optional[str]) -> tuple:
+    """系统消息元组（按系统提示词缓存，各请求共享同一个对象，不可修改）"""
+    if not system_prompt:
+        return ()
+    return ({"role": "system", "content": system_prompt},)
+
+
+# 改写时单次输入的token上限（常规的3000字分块可以完整放入）
+_REWRITE_MAX_INPUT_TOKENS = 4000
+
+
+@lru_cache(maxsize=8)
+def _token_encoding(model: str):
+    """获取模型对应的tokenizer（未安装tiktoken时返回None）"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️  tokenizer加载失败，改为按字符数截取: {e}")
+        return None
+
+
+@lru_cache(maxsize=64)
+def _encode_tokens(encoding, text: str) -> tuple:
+    """将文本编码为token（按文本缓存，同一段落以不同风格改写时无需重复编码）"""
+    return tuple(encoding.encode_ordinary(text))
+
+
+# 分析类请求使用的固定随机种子（配合temperature=0，使结果可复现、可缓存）
+_ANALYSIS_SEED = 42
+
+# 并发请求遇到限流或超时时的重试次数和首次重试前的等待秒数（之后每次翻倍）
+_RETRY_ATTEMPTS = 4
+_RETRY_BASE_DELAY = 1.0
+
+# Batch API 任务的终止状态
+_BATCH_FINAL_STATUSES = frozenset({'completed', 'failed', 'expired', 'cancelled'})
+
+
+def _count_names(content: str, names: Iterable[str]) -> Dict[str, int]:
+    """
+    统计多个人名在文本中的出现次数
+    
+    安装了pyahocorasick时只扫描一遍文本，否则逐个调用str.count
+    """
+    names = [name for name in dict.fromkeys(names) if name]
+    if not _HAS_AC or not names:
+        return {name: content.count(name) for name in names}
+    
+    automaton = ahocorasick.Automaton()
+    for name in names:
+        automaton.add_word(name, name)
+    automaton.make_automaton()
+    counts = Counter(name for _, name in automaton.iter(content))
+    return {name: counts[name] for name in names}
+
+
+# 改写提示词的静态部分（逐字节保持不变，以便命中服务端的前缀缓存）
+_REWRITE_SYSTEM_PROMPT = "你是一个专业的文本改写专家，擅长将文本改写为不同的风格和视角。"
+
+_CHARACTER_SYSTEM_PROMPT = "你是一个专业的小说分析专家，擅长分析小说中的人物、情节和主题。"
+
+_STORYLINE_SYSTEM_PROMPT = "你是一个专业的小说分析专家。"
+
+_REWRITE_INSTRUCTIONS = """你是一位资深的文本改写专家和语言优化大师，擅长使用深度学习技术进行自然语言处理和文本优化。
+
+## 任务
+请将文末给出的原文改写为文末指定的目标风格（及视角），并进行深度语言优化。
+
+## 改写要求（核心原则）
+
+### 1. 深度理解文本
+- **语义理解**：深入理解文本的语义、情感和语境
+- **上下文连贯**：确保改写后的文本与上下文自然衔接
+- **人物性格**：保持人物性格和说话风格的一致性
+- **故事逻辑**：绝对不能改变故事情节、事件发展和逻辑关系
+
+### 2. 自然流畅的语言优化
+- **自然表达**：改写后的文本必须像人类自然写作一样流畅
+- **避免机械化**：绝对不能进行简单的词汇替换，要理解后再改写
+- **语言质量**：使用更生动、更精准、更符合风格特点的表达
+- **流畅度**：确保每个句子都读起来自然顺畅，没有生硬感
+
+### 3. 风格的自然融合
+- **风格融入**：将目标风格的特点自然地融入到文本中
+- **避免标签化**：不要生硬地插入风格关键词，要让风格体现在整体表达中
+- **适度原则**：不要为了体现风格而过度修改，保持文本的连贯性
+- **风格一致性**：确保整个文本的风格保持一致
+
+### 4. 深度学习优化策略
+- **语义分析**：分析文本的深层语义，理解作者的意图
+- **语境适配**：根据不同的语境选择合适的表达方式
+- **语言模型**：使用自然语言生成技术，让改写更像人类写作
+- **质量提升**：在保持原意的基础上，提升文本的语言质量和可读性
+
+## 改写示例（参考）
+
+**原文**：陈旭说："好的，我明白了。"
+
+**都市幽默风格改写**：
+- ❌ 错误示例：陈旭在都市的咖啡厅里说："好的，我明白了。"，哈哈（生硬插入）
+- ✅ 正确示例：陈旭在繁华都市的咖啡厅里，轻松地笑着说："好的，我明白了。"（自然融合）
+
+## 输出要求
+1. 直接输出改写后的文本，不要添加任何解释
+2. 保持原文的段落结构和格式
+3. 确保改写后的文本自然流畅，读起来像原创作品
+4. 如果原文是对话，保持对话的自然性"""
+
+
+# 风格名 -> 风格描述
+_STYLE_DESCRIPTIONS = {
+    '现代': '现代简洁的语言风格',
+    '古典': '古典文雅的文言文风格',
+    '简洁': '简洁明了的表达方式',
+    '华丽': '华丽优美的辞藻',
+    '悬疑': '悬疑紧张的氛围',
+    '浪漫': '浪漫温馨的描写',
+    '幽默': '幽默风趣的表达',
+    '严肃': '严肃庄重的语调',
+    '科幻': '科幻未来感的风格，充满科技元素',
+    '武侠': '武侠小说的风格，充满江湖气息',
+    '青春': '青春活泼的风格，轻松明快',
+    '都市': '现代都市生活的风格，充满都市气息和现代感',
+    '都市幽默': '都市风格与幽默风格的结合，既有都市感又充满幽默风趣',
+    '都市+幽默': '都市风格与幽默风格的结合',
+    '都市、幽默': '都市风格与幽默风格的结合',
+    '古风': '古代文雅的风格',
+    '诗化': '诗意化的表达，充满文学美感',
+    '口语': '口语化的表达，贴近日常对话',
+    '正式': '正式书面语的风格',
+    '网络': '网络用语风格，轻松活泼',
+    '文艺': '文艺范的风格，充满文学气息'
+}
+
+
+@lru_cache(maxsize=256)
+def _resolve_style(style: str) -> str:
+    """将风格名（支持"都市+幽默"等组合风格）解析为风格描述"""
+    if '+' in style or '、' in style or '，' in style:
+        styles = _STYLE_SPLIT_RE.split(style)
+        return '和'.join([_STYLE_DESCRIPTIONS.get(s.strip(), s.strip()) for s in styles])
+    return _STYLE_DESCRIPTIONS.get(style, style)
+
+
+@lru_cache(maxsize=256)
+def _style_section(style: str, perspective: Optional[str] = None) -> str:
+    """改写提示词末尾的目标风格部分（按风格和视角缓存）"""
+    perspective_desc = f"，转换为{perspective}视角" if perspective else ""
+    return f"## 目标风格\n{_resolve_style(style)}{perspective_desc}\n\n请开始改写（直接输出改写后的文本）："
+
 
 class AIAnalyzerBase(ABC):
     """AI分析器基类"""
@@ -39,47 +247,335 @@ class AIAnalyzerBase(ABC):
 class OpenAIAnalyzer(AIAnalyzerBase):
     """OpenAI API分析器"""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo",
+                 semantic_cache: bool = False,
+                 cache_threshold: float = 0.95,
+                 cache_path: str = "data/cache/semantic_cache.sqlite3",
+                 embedding_model: str = "text-embedding-3-small",
+                 use_cache: bool = True,
+                 response_cache_path: str = "data/cache/response_cache.sqlite3",
+                 batch_mode: bool = False,
+                 seed: Optional[int] = None):
         """
         初始化OpenAI分析器
         
         Args:
             api_key: OpenAI API密钥
             model: 使用的模型名称
+            semantic_cache: 是否启用语义缓存（分析请求的原文相似时直接返回缓存结果，改写请求不使用）
+            cache_threshold: 语义缓存命中阈值（余弦相似度）
+            cache_path: 语义缓存文件路径
+            embedding_model: 计算提示词嵌入使用的模型
+            use_cache: 是否启用响应缓存（完全相同的请求直接返回上次的结果）
+            response_cache_path: 响应缓存文件路径
+            batch_mode: 是否通过Batch API批量改写（适合离线任务，费用减半但可能需要数小时完成）
+            seed: 改写时使用的随机种子（可选，固定后相同请求的结果可复现）
         """
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.model = model
+        self.embedding_model = embedding_model
+        self.batch_mode = batch_mode
+        self.seed = seed
+        # 最近一次响应的后端版本标识，变化后旧的缓存条目不再命中
+        self.system_fingerprint = None
         
         if not self.api_key:
             raise ValueError("需要设置OPENAI_API_KEY环境变量或传入api_key参数")
         
         try:
-            import openai
+            openai = _lazy_openai()
             self.client = openai.OpenAI(api_key=self.api_key)
         except ImportError:
             raise ImportError("请安装openai库: pip install openai")
+        # 异步客户端（批量并发调用）在每次并发调用时创建，见 _async_client
+        self.aclient = None
+        self._aclient_users = 0
+        
+        prompt_cache = _lazy_prompt_cache() if (semantic_cache or use_cache) else None
+        
+        # 语义缓存（可选）
+        self.semantic_cache = None
+        if semantic_cache and prompt_cache:
+            try:
+                self.semantic_cache = prompt_cache.SemanticPromptCache(cache_path, threshold=cache_threshold)
+            except Exception as e:
+                print(f"⚠️  语义缓存初始化失败: {e}")
+        
+        # 响应缓存（精确匹配）
+        self.response_cache = None
+        if use_cache and prompt_cache:
+            try:
+                self.response_cache = prompt_cache.ResponseCache(response_cache_path)
+            except Exception as e:
+                print(f"⚠️  响应缓存初始化失败: {e}")
+    
+    def _response_cache_key(self, prompt: str, system_prompt: Optional[str], max_tokens: int,
+                            json_mode: bool, temperature: float, seed: Optional[int]) -> Optional[str]:
+        """计算响应缓存键（未启用响应缓存时返回None）"""
+        if not self.response_cache:
+            return None
+        return self.response_cache.make_key(
+            self.model, max_tokens, json_mode, temperature, seed, system_prompt or '', prompt
+        )
     
-    def _call_api(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2000) -> str:
-        """调用OpenAI API"""
+    def _semantic_namespace(self, system_prompt: Optional[str], max_tokens: int) -> str:
+        """计算语义缓存的命名空间（模型、max_tokens或任务不同的请求互不命中）"""
+        task = hashlib.sha1((system_prompt or '').encode('utf-8')).hexdigest()[:12]
+        return f"{self.model}:{max_tokens}:{self.embedding_model}:{task}"
+    
+    def _cached_response(self, cache_key: Optional[str]) -> Optional[str]:
+        """查询响应缓存（后端版本已变化的条目视为未命中）"""
+        if cache_key is None:
+            return None
+        return self.response_cache.get(cache_key, self.system_fingerprint)
+    
+    def _store_response(self, cache_key: Optional[str], content: str, fingerprint: Optional[str] = None):
+        """写入响应缓存"""
+        if fingerprint:
+            self.system_fingerprint = fingerprint
+        if cache_key is None or not content:
+            return
         try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
+            self.response_cache.set(cache_key, content, fingerprint)
+        except Exception as e:
+            print(f"⚠️  写入响应缓存失败: {e}")
+    
+    @asynccontextmanager
+    async def _async_client(self):
+        """
+        在当前事件循环中使用异步客户端，最外层调用结束时关闭
+        
+        客户端的连接绑定在创建它的事件循环上，每次 asyncio.run 都需要新建，不能跨事件循环复用
+        """
+        if self._aclient_users == 0:
+            import httpx
+            # 放宽连接池上限以支持高并发
+            self.aclient = _lazy_openai().AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=256, max_keepalive_connections=256)
+                )
+            )
+        self._aclient_users += 1
+        try:
+            yield self.aclient
+        finally:
+            self._aclient_users -= 1
+            if self._aclient_users == 0:
+                await self.aclient.close()
+                self.aclient = None
+    
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """计算文本的嵌入向量"""
+        try:
+            response = self.client.embeddings.create(model=self.embedding_model, input=text)
+            return response.data[0].embedding
+        except Exception as e:
+            print(f"⚠️  嵌入计算失败: {e}")
+            return None
+    
+    async def _aembed(self, text: str) -> Optional[List[float]]:
+        """计算文本的嵌入向量（异步）"""
+        try:
+            response = await self.aclient.embeddings.create(model=self.embedding_model, input=text)
+            return response.data[0].embedding
+        except Exception as e:
+            print(f"⚠️  嵌入计算失败: {e}")
+            return None
+    
+    @staticmethod
+    def _build_messages(prompt: str, system_prompt: Optional[str] = None) -> tuple:
+        """构建对话消息列表（系统消息复用缓存的元组，只新建用户消息）"""
+        return _system_messages(system_prompt) + ({"role": "user", "content": prompt},)
+    
+    def _call_api(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2000,
+                  prompt_cache_key: Optional[str] = None,
+                  json_mode: bool = False,
+                  temperature: float = 0.7,
+                  seed: Optional[int] = None,
+                  stream: bool = False,
+                  max_chars: Optional[int] = None,
+                  on_token: Optional[Callable[[str], None]] = None,
+                  semantic_text: Optional[str] = None) -> str:
+        """
+        调用OpenAI API（支持响应缓存、语义缓存和流式输出）
+        
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            max_tokens: 最大生成token数
+            prompt_cache_key: 服务端前缀缓存的路由键（可选，相同前缀的请求使用相同的键）
+            json_mode: 是否要求模型返回JSON对象
+            temperature: 采样温度（分析类请求使用0，保证结果稳定）
+            seed: 随机种子（可选）
+            stream: 是否使用流式输出
+            max_chars: 流式输出的字符预算，超出后提前结束（可选）
+            on_token: 流式输出时每收到一段文本的回调（可选）
+            semantic_text: 计算语义缓存嵌入的文本（只含提示词中的可变部分，如原文片段；
+                           为None时不使用语义缓存）
+        """
+        # 查询响应缓存（完全相同的请求）
+        cache_key = self._response_cache_key(prompt, system_prompt, max_tokens, json_mode, temperature, seed)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return cached
+        
+        # 查询语义缓存（提示词模板是固定的，只按可变部分计算嵌入，否则不同原文的嵌入也会高度相似）
+        embedding = None
+        namespace = self._semantic_namespace(system_prompt, max_tokens)
+        if self.semantic_cache and semantic_text:
+            embedding = self._embed(semantic_text)
+            if embedding is not None:
+                cached = self.semantic_cache.lookup(namespace, embedding)
+                if cached is not None:
+                    return cached
+        
+        try:
+            extra_body = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
             response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=0.7
+                **self._request_body(prompt, system_prompt, max_tokens, json_mode, temperature, seed),
+                extra_body=extra_body,
+                stream=stream
             )
-            return response.choices[0].message.content
+            truncated = False
+            if stream:
+                content, fingerprint, truncated = self._collect_stream(response, max_chars, on_token)
+            else:
+                content = response.choices[0].message.content
+                fingerprint = getattr(response, 'system_fingerprint', None)
+            
+            # 按字符预算截断的输出不是完整响应，不写入缓存
+            self._store_response(None if truncated else cache_key, content, fingerprint)
+            if embedding is not None and content and not truncated:
+                try:
+                    self.semantic_cache.add(namespace, embedding, content)
+                except Exception as e:
+                    print(f"⚠️  写入语义缓存失败: {e}")
+            
+            return content
+        except Exception as e:
+            print(f"⚠️  API调用失败: {e}")
+            return ""
+    
+    def _request_body(self, prompt: str, system_prompt: Optional[str], max_tokens: int,
+                      json_mode: bool, temperature: float, seed: Optional[int]) -> Dict[str, Any]:
+        """
+        构建Chat Completions请求参数
+        
+        未设置的可选参数不加入请求（传None会被序列化为null，部分兼容OpenAI的服务会拒绝）
+        """
+        body = {
+            "model": self.model,
+            "messages": self._build_messages(prompt, system_prompt),
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if seed is not None:
+            body["seed"] = seed
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+        return body
+    
+    @staticmethod
+    def _collect_stream(response, max_chars: Optional[int] = None,
+                        on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[str], bool]:
+        """
+        收集流式响应，超过字符预算时提前断开
+        
+        提前断开时输出停在句子中间，退回到最后一个完整句子的结尾
+        
+        Returns:
+            (文本, 后端版本标识, 是否按预算截断)
+        """
+        parts = []
+        length = 0
+        fingerprint = None
+        try:
+            for chunk in response:
+                fingerprint = getattr(chunk, 'system_fingerprint', None) or fingerprint
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                length += len(delta)
+                if on_token:
+                    on_token(delta)
+                if max_chars and length >= max_chars:
+                    break
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        
+        content = ''.join(parts)
+        truncated = bool(max_chars) and length >= max_chars
+        if truncated:
+            match = _LAST_SENT_TAIL_RE.search(content)
+            if match:
+                content = content[:match.end()]
+        return content, fingerprint, truncated
+    
+    async def _acall_api(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2000,
+                         prompt_cache_key: Optional[str] = None, json_mode: bool = False,
+                         temperature: float = 0.7, seed: Optional[int] = None,
+                         semantic_text: Optional[str] = None) -> str:
+        """调用OpenAI API（异步版本，参数同 _call_api；需在 _async_client 的作用域内调用）"""
+        cache_key = self._response_cache_key(prompt, system_prompt, max_tokens, json_mode, temperature, seed)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        embedding = None
+        namespace = self._semantic_namespace(system_prompt, max_tokens)
+        if self.semantic_cache and semantic_text:
+            embedding = await self._aembed(semantic_text)
+            if embedding is not None:
+                cached = self.semantic_cache.lookup(namespace, embedding)
+                if cached is not None:
+                    return cached
+        
+        openai = _lazy_openai()
+        try:
+            extra_body = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
+            # 限流或超时时按指数退避重试（加随机抖动，避免并发请求同时重试）
+            for attempt in range(_RETRY_ATTEMPTS + 1):
+                try:
+                    response = await self.aclient.chat.completions.create(
+                        **self._request_body(prompt, system_prompt, max_tokens, json_mode, temperature, seed),
+                        extra_body=extra_body
+                    )
+                    break
+                except (openai.RateLimitError, openai.APITimeoutError):
+                    if attempt == _RETRY_ATTEMPTS:
+                        raise
+                    await asyncio.sleep(_RETRY_BASE_DELAY * 2 ** attempt * random.uniform(1.0, 1.5))
+            content = response.choices[0].message.content
+            
+            self._store_response(cache_key, content, getattr(response, 'system_fingerprint', None))
+            if embedding is not None and content:
+                try:
+                    self.semantic_cache.add(namespace, embedding, content)
+                except Exception as e:
+                    print(f"⚠️  写入语义缓存失败: {e}")
+            
+            return content
         except Exception as e:
             print(f"⚠️  API调用失败: {e}")
             return ""
     
     def analyze_characters(self, content: str) -> Dict[str, Dict]:
         """使用AI分析人物"""
+        response = self._call_api(
+            self._characters_prompt(content), _CHARACTER_SYSTEM_PROMPT, max_tokens=2000, json_mode=True,
+            temperature=0, seed=_ANALYSIS_SEED, semantic_text=content[:5000]
+        )
+        return self._parse_characters(response, content)
+    
+    def _characters_prompt(self, content: str) -> str:
+        """构建人物分析提示词"""
         # 截取部分内容进行分析（避免token过多）
         sample = content[:5000] if len(content) > 5000 else content
         
@@ -103,55 +599,59 @@ class OpenAIAnalyzer(AIAnalyzerBase):
   ]
 }}
 """
-        
-        system_prompt = "你是一个专业的小说分析专家，擅长分析小说中的人物、情节和主题。"
-        
-        response = self._call_api(prompt, system_prompt, max_tokens=2000)
-        
-        # 解析JSON响应
+        return prompt
+    
+    def _parse_characters(self, response: str, content: str) -> Dict[str, Dict]:
+        """解析人物分析的JSON响应"""
         try:
-            result = json.loads(response)
+            result = _json_loads(response)
+            parsed = [char for char in result.get('characters', []) if char.get('name', '')]
+            counts = _count_names(content, (char['name'] for char in parsed))
             characters = {}
-            for char in result.get('characters', []):
-                name = char.get('name', '')
-                if name:
-                    characters[name] = {
-                        'name': name,
-                        'role': char.get('role', '配角'),
-                        'description': char.get('description', ''),
-                        'importance': char.get('importance', 5),
-                        'count': content.count(name)
-                    }
+            for char in parsed:
+                name = char['name']
+                characters[name] = {
+                    'name': name,
+                    'role': char.get('role', '配角'),
+                    'description': char.get('description', ''),
+                    'importance': char.get('importance', 5),
+                    'count': counts[name]
+                }
             return characters
-        except:
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"⚠️  人物分析结果解析失败: {e}")
             return {}
     
     def analyze_storyline(self, content: str) -> Dict:
         """使用AI分析故事脉络"""
-        # 提取章节标题和开头
-        chapters = []
-        chapter_pattern = r'第\s*(\d+)\s*章[：:：]?\s*(.*?)\n'
+        # 选择代表性章节（开头10章、中间5章、结尾10章），只扫描需要的区间
+        mid_pos = len(content) // 2
+        tail_pos = max(mid_pos, len(content) - 200000)
+        front = islice(_CHAPTER_RE.finditer(content), 10)
+        middle = islice(_CHAPTER_RE.finditer(content, mid_pos), 5)
+        tail = deque(_CHAPTER_RE.finditer(content, tail_pos), maxlen=10)
         
-        for match in re.finditer(chapter_pattern, content):
+        # 短篇小说三个区间会重叠，按位置去重并保持顺序
+        matches = {match.start(): match for match in chain(front, middle, tail)}
+        
+        # 提取章节标题和开头
+        sample_chapters = []
+        for start in sorted(matches):
+            match = matches[start]
             chapter_num = int(match.group(1))
             chapter_title = match.group(2).strip() if match.group(2) else f"第{chapter_num}章"
             start_pos = match.end()
-            end_pos = min(start_pos + 500, len(content))
-            chapter_content = content[start_pos:end_pos]
-            
-            chapters.append({
+            sample_chapters.append({
                 'num': chapter_num,
                 'title': chapter_title,
-                'summary': chapter_content[:200]
+                'summary': content[start_pos:start_pos + 200]
             })
         
-        # 选择代表性章节
-        sample_chapters = chapters[:10] + chapters[len(chapters)//2:len(chapters)//2+5] + chapters[-10:]
-        
+        chapters_info = json.dumps(sample_chapters, ensure_ascii=False, indent=2)
         prompt = f"""请分析以下小说的故事脉络和主题。
 
 章节信息：
-{json.dumps(sample_chapters, ensure_ascii=False, indent=2)}
+{chapters_info}
 
 请分析：
 1. 故事的主要主题和核心冲突
@@ -162,20 +662,24 @@ class OpenAIAnalyzer(AIAnalyzerBase):
 请以JSON格式返回分析结果。
 """
         
-        system_prompt = "你是一个专业的小说分析专家。"
-        
-        response = self._call_api(prompt, system_prompt, max_tokens=1500)
+        response = self._call_api(
+            prompt, _STORYLINE_SYSTEM_PROMPT, max_tokens=1500, json_mode=True, temperature=0, seed=_ANALYSIS_SEED,
+            semantic_text=chapters_info
+        )
         
         try:
-            return json.loads(response)
-        except:
+            return _json_loads(response)
+        except (ValueError, TypeError) as e:
+            print(f"⚠️  故事脉络分析结果解析失败: {e}")
             return {'theme': '', 'structure': '', 'turning_points': [], 'tone': ''}
     
     def analyze_plot(self, content: str) -> Dict:
         """使用AI分析情节结构"""
         return self.analyze_storyline(content)
     
-    def rewrite_text(self, text: str, style: str, perspective: Optional[str] = None, context: Optional[str] = None) -> str:
+    def rewrite_text(self, text: str, style: str, perspective: Optional[str] = None,
+                     context: Optional[str] = None,
+                     on_token: Optional[Callable[[str], None]] = None) -> str:
         """
         使用AI改写文本（深度学习优化版）
         
@@ -184,114 +688,220 @@ class OpenAIAnalyzer(AIAnalyzerBase):
             style: 目标风格
             perspective: 目标视角
             context: 上下文信息（可选，用于更好的理解）
+            on_token: 流式输出回调（可选，用于实时显示改写进度）
         """
-        # 截取文本（避免token过多），但保留更多上下文
+        sample = self._rewrite_sample(text)
+        # 改写结果与原文长度相当，超出预算的输出直接截断，不再等待
+        # 改写结果只对应这段原文，相似段落的结果不能互相替代，因此不使用语义缓存
+        response = self._call_api(
+            self._rewrite_prompt(sample, style, perspective, context), _REWRITE_SYSTEM_PROMPT,
+            max_tokens=2500, prompt_cache_key=f"rewrite:{style}", seed=self.seed,
+            stream=True, max_chars=int(len(sample) * 1.3) + 200, on_token=on_token
+        )
+        return response if response else text
+    
+    async def rewrite_text_batch(self, texts: List[str], style: str,
+                                 perspective: Optional[str] = None,
+                                 contexts: Optional[List[Optional[str]]] = None,
+                                 concurrency: int = 8) -> List[str]:
+        """
+        并发改写多段文本
+        
+        Args:
+            texts: 要改写的文本列表
+            style: 目标风格
+            perspective: 目标视角
+            contexts: 与texts一一对应的上下文列表（可选）
+            concurrency: 最大并发请求数（过高时容易触发API限流）
+        
+        Returns:
+            与texts一一对应的改写结果列表（失败的段落返回原文，并打印失败段落数）
+        """
+        if contexts is None:
+            contexts = [None] * len(texts)
+        if self.batch_mode:
+            return await self._rewrite_via_batch(texts, style, perspective, contexts)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _one(text: str, context: Optional[str]) -> str:
+            async with semaphore:
+                response = await self._acall_api(
+                    self._rewrite_prompt(self._rewrite_sample(text), style, perspective, context),
+                    _REWRITE_SYSTEM_PROMPT,
+                    max_tokens=2500, prompt_cache_key=f"rewrite:{style}", seed=self.seed
+                )
+            return response
+        
+        async with self._async_client():
+            responses = await asyncio.gather(*[_one(text, context) for text, context in zip(texts, contexts)])
+        
+        failed = sum(1 for response in responses if not response)
+        if failed:
+            print(f"⚠️  {failed}/{len(texts)} 段AI改写失败，已保留原文")
+        return [response if response else text for response, text in zip(responses, texts)]
+    
+    async def _rewrite_via_batch(self, texts: List[str], style: str, perspective: Optional[str],
+                                 contexts: List[Optional[str]]) -> List[str]:
+        """通过Batch API改写多段文本（已缓存的段落不再提交）"""
+        results = list(texts)
+        requests = []
+        cache_keys = {}
+        for i, (text, context) in enumerate(zip(texts, contexts)):
+            prompt = self._rewrite_prompt(self._rewrite_sample(text), style, perspective, context)
+            cache_key = self._response_cache_key(prompt, _REWRITE_SYSTEM_PROMPT, 2500, False, 0.7, self.seed)
+            cached = self._cached_response(cache_key)
+            if cached is not None:
+                results[i] = cached
+                continue
+            custom_id = f"rewrite-{i}"
+            cache_keys[custom_id] = cache_key
+            requests.append(self._batch_request(
+                custom_id, prompt, _REWRITE_SYSTEM_PROMPT, max_tokens=2500, seed=self.seed
+            ))
+        
+        if not requests:
+            return results
+        
+        try:
+            batch_id = self.submit_batch(requests)
+            print(f"📦 已提交批量改写任务: {batch_id}（{len(requests)} 段）")
+            outputs = await self.wait_batch(batch_id)
+        except Exception as e:
+            print(f"⚠️  批量改写失败: {e}")
+            return results
+        
+        for custom_id, content in outputs.items():
+            if content and custom_id in cache_keys:
+                results[int(custom_id.split('-', 1)[1])] = content
+                self._store_response(cache_keys[custom_id], content)
+        return results
+    
+    def _batch_request(self, custom_id: str, prompt: str, system_prompt: Optional[str] = None,
+                       max_tokens: int = 2000, json_mode: bool = False,
+                       temperature: float = 0.7, seed: Optional[int] = None) -> Dict[str, Any]:
+        """构建Batch API输入文件中的一行请求"""
+        body = self._request_body(prompt, system_prompt, max_tokens, json_mode, temperature, seed)
+        return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+    
+    def submit_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """
+        提交批量请求（Batch API，24小时内完成）
+        
+        Args:
+            requests: 请求列表（由 _batch_request 构建，custom_id 需唯一）
+        
+        Returns:
+            批量任务ID
+        """
+        lines = '\n'.join(json.dumps(request, ensure_ascii=False) for request in requests)
+        batch_file = self.client.files.create(
+            file=("batch.jsonl", lines.encode('utf-8')),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    def poll_batch(self, batch_id: str) -> str:
+        """查询批量任务状态（validating/in_progress/completed/failed/expired/cancelled等）"""
+        return self.client.batches.retrieve(batch_id).status
+    
+    def collect_results(self, batch_id: str) -> Dict[str, str]:
+        """
+        获取批量任务的结果
+        
+        Args:
+            batch_id: 批量任务ID
+        
+        Returns:
+            custom_id -> 生成的文本（失败的请求不包含在内）
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return {}
+        
+        results = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = _json_loads(line)
+            response = item.get('response') or {}
+            if response.get('status_code') != 200:
+                continue
+            choices = response.get('body', {}).get('choices') or []
+            if choices:
+                results[item['custom_id']] = choices[0]['message']['content']
+        return results
+    
+    async def wait_batch(self, batch_id: str, poll_interval: float = 30.0,
+                         timeout: Optional[float] = None) -> Dict[str, str]:
+        """
+        等待批量任务结束并获取结果
+        
+        Args:
+            batch_id: 批量任务ID
+            poll_interval: 轮询间隔（秒）
+            timeout: 最长等待时间（秒，None表示一直等待）
+        
+        Returns:
+            custom_id -> 生成的文本
+        """
+        waited = 0.0
+        while True:
+            status = self.poll_batch(batch_id)
+            if status in _BATCH_FINAL_STATUSES:
+                break
+            if timeout is not None and waited >= timeout:
+                print(f"⚠️  批量任务等待超时: {batch_id}（状态: {status}）")
+                return {}
+            await asyncio.sleep(poll_interval)
+            waited += poll_interval
+        
+        if status != 'completed':
+            print(f"⚠️  批量任务未完成: {batch_id}（状态: {status}）")
+        return self.collect_results(batch_id)
+    
+    def _rewrite_sample(self, text: str) -> str:
+        """截取要改写的文本（避免token过多），但保留更多上下文"""
+        encoding = _token_encoding(self.model)
+        if encoding is None:
+            return self._rewrite_sample_chars(text)
+        
+        # 按token预算截取（文本在预算内时直接返回，不再查找句子边界）
+        tokens = _encode_tokens(encoding, text)
+        if len(tokens) <= _REWRITE_MAX_INPUT_TOKENS:
+            return text
+        sample = encoding.decode(tokens[:_REWRITE_MAX_INPUT_TOKENS]).rstrip('\ufffd')
+        # 找到后三分之一范围内的最后一个句末标点，保持句子完整
+        match = _LAST_SENT_END_RE.search(sample, len(sample) * 2 // 3 + 1)
+        return sample[:match.end()] if match else sample
+    
+    @staticmethod
+    def _rewrite_sample_chars(text: str) -> str:
+        """按字符数截取要改写的文本（未安装tiktoken时使用）"""
         if len(text) > 3000:
             # 如果文本很长，取前3000字符，但要尽量保持句子完整
             sample = text[:3000]
-            # 找到最后一个句号，保持句子完整
-            last_period = sample.rfind('。')
-            last_exclamation = sample.rfind('！')
-            last_question = sample.rfind('？')
-            last_sentence_end = max(last_period, last_exclamation, last_question)
-            if last_sentence_end > 2000:  # 如果找到的句子结束位置合理
-                sample = text[:last_sentence_end + 1]
+            # 找到2000字符之后的最后一个句末标点，保持句子完整
+            match = _LAST_SENT_END_RE.search(sample, 2001)
+            if match:  # 如果找到的句子结束位置合理
+                sample = text[:match.end()]
         else:
             sample = text
-        
-        style_descriptions = {
-            '现代': '现代简洁的语言风格',
-            '古典': '古典文雅的文言文风格',
-            '简洁': '简洁明了的表达方式',
-            '华丽': '华丽优美的辞藻',
-            '悬疑': '悬疑紧张的氛围',
-            '浪漫': '浪漫温馨的描写',
-            '幽默': '幽默风趣的表达',
-            '严肃': '严肃庄重的语调',
-            '科幻': '科幻未来感的风格，充满科技元素',
-            '武侠': '武侠小说的风格，充满江湖气息',
-            '青春': '青春活泼的风格，轻松明快',
-            '都市': '现代都市生活的风格，充满都市气息和现代感',
-            '都市幽默': '都市风格与幽默风格的结合，既有都市感又充满幽默风趣',
-            '都市+幽默': '都市风格与幽默风格的结合',
-            '都市、幽默': '都市风格与幽默风格的结合',
-            '古风': '古代文雅的风格',
-            '诗化': '诗意化的表达，充满文学美感',
-            '口语': '口语化的表达，贴近日常对话',
-            '正式': '正式书面语的风格',
-            '网络': '网络用语风格，轻松活泼',
-            '文艺': '文艺范的风格，充满文学气息'
-        }
-        
-        perspective_desc = f"，转换为{perspective}视角" if perspective else ""
-        
-        # 处理组合风格
-        if '+' in style or '、' in style or '，' in style:
-            styles = re.split(r'[+、，]', style)
-            style_desc = '和'.join([style_descriptions.get(s.strip(), s.strip()) for s in styles])
-        else:
-            style_desc = style_descriptions.get(style, style)
-        
+        return sample
+    
+    def _rewrite_prompt(self, sample: str, style: str, perspective: Optional[str] = None,
+                        context: Optional[str] = None) -> str:
+        """构建改写提示词（静态前缀 + 原文 + 目标风格）"""
         # 构建上下文信息
         context_info = ""
         if context:
             context_info = f"\n\n上下文信息：\n{context[:500]}"
         
-        prompt = f"""你是一位资深的文本改写专家和语言优化大师，擅长使用深度学习技术进行自然语言处理和文本优化。
-
-## 任务
-请将以下文本改写为{style_desc}{perspective_desc}，并进行深度语言优化。
-
-## 原文
-{sample}{context_info}
-
-## 改写要求（核心原则）
-
-### 1. 深度理解文本
-- **语义理解**：深入理解文本的语义、情感和语境
-- **上下文连贯**：确保改写后的文本与上下文自然衔接
-- **人物性格**：保持人物性格和说话风格的一致性
-- **故事逻辑**：绝对不能改变故事情节、事件发展和逻辑关系
-
-### 2. 自然流畅的语言优化
-- **自然表达**：改写后的文本必须像人类自然写作一样流畅
-- **避免机械化**：绝对不能进行简单的词汇替换，要理解后再改写
-- **语言质量**：使用更生动、更精准、更符合风格特点的表达
-- **流畅度**：确保每个句子都读起来自然顺畅，没有生硬感
-
-### 3. 风格的自然融合
-- **风格融入**：将{style_desc}的特点自然地融入到文本中
-- **避免标签化**：不要生硬地插入风格关键词，要让风格体现在整体表达中
-- **适度原则**：不要为了体现风格而过度修改，保持文本的连贯性
-- **风格一致性**：确保整个文本的风格保持一致
-
-### 4. 深度学习优化策略
-- **语义分析**：分析文本的深层语义，理解作者的意图
-- **语境适配**：根据不同的语境选择合适的表达方式
-- **语言模型**：使用自然语言生成技术，让改写更像人类写作
-- **质量提升**：在保持原意的基础上，提升文本的语言质量和可读性
-
-## 改写示例（参考）
-
-**原文**：陈旭说："好的，我明白了。"
-
-**都市幽默风格改写**：
-- ❌ 错误示例：陈旭在都市的咖啡厅里说："好的，我明白了。"，哈哈（生硬插入）
-- ✅ 正确示例：陈旭在繁华都市的咖啡厅里，轻松地笑着说："好的，我明白了。"（自然融合）
-
-## 输出要求
-1. 直接输出改写后的文本，不要添加任何解释
-2. 保持原文的段落结构和格式
-3. 确保改写后的文本自然流畅，读起来像原创作品
-4. 如果原文是对话，保持对话的自然性
-
-请开始改写（直接输出改写后的文本）：
-"""
-        
-        system_prompt = f"你是一个专业的文本改写专家，擅长将文本改写为不同的风格和视角。"
-        
-        response = self._call_api(prompt, system_prompt, max_tokens=2500)
-        return response if response else text
+        return f"{_REWRITE_INSTRUCTIONS}\n\n## 原文\n{sample}{context_info}\n\n{_style_section(style, perspective)}"
 
 
 class LocalLLMAnalyzer(AIAnalyzerBase):
@@ -309,32 +919,58 @@ class LocalLLMAnalyzer(AIAnalyzerBase):
         self.model = model
         self.available = False
         
-        # 检查服务是否可用
+        # 复用同一个keep-alive会话，避免每次请求都重新建立TCP连接
         try:
+            import httpx
+            self._session = httpx.Client(
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=32)
+            )
+        except ImportError:
             import requests
-            response = requests.get(f"{base_url}/api/tags", timeout=2)
+            self._session = requests.Session()
+        
+        # 检查服务是否可用
+        try:
+            response = self._session.get(f"{base_url}/api/tags", timeout=2)
             if response.status_code == 200:
                 self.available = True
                 print(f"✅ 本地LLM服务连接成功: {base_url}")
             else:
                 print(f"⚠️  本地LLM服务不可用: {base_url}")
-        except:
+        except Exception:
             print(f"⚠️  无法连接到本地LLM服务: {base_url}")
     
+    def close(self):
+        """关闭HTTP会话"""
+        session = getattr(self, '_session', None)
+        if session is not None:
+            session.close()
+            self._session = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
+    def _payload(self, prompt: str) -> Dict[str, Any]:
+        """构建生成请求的JSON体"""
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False
+        }
+    
     def _call_api(self, prompt: str) -> str:
         """调用本地LLM API"""
         if not self.available:
             return ""
         
         try:
-            import requests
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                },
+                json=self._payload(prompt),
                 timeout=30
             )
             if response.status_code == 200:
@@ -387,7 +1023,12 @@ class AIAnalyzerFactory:
             try:
                 return OpenAIAnalyzer(
                     api_key=kwargs.get('api_key'),
-                    model=kwargs.get('model', 'gpt-3.5-turbo')
+                    model=kwargs.get('model', 'gpt-3.5-turbo'),
+                    semantic_cache=kwargs.get('semantic_cache', False),
+                    cache_threshold=kwargs.get('cache_threshold', 0.95),
+                    use_cache=kwargs.get('use_cache', True),
+                    batch_mode=kwargs.get('batch_mode', False),
+                    seed=kwargs.get('seed')
                 )
             except Exception as e:
                 print(f"⚠️  无法创建OpenAI分析器: {e}")
@@ -434,7 +1075,8 @@ class AIAnalyzerFactory:
                 from huggingface_analyzer import HuggingFaceAnalyzer
                 model_path = kwargs.get('model_path', 'models/pretrained/Qwen_Qwen-7B-Chat')
                 model_type = kwargs.get('model_type', 'auto')
-                analyzer = HuggingFaceAnalyzer(model_path=model_path, model_type=model_type)
+                analyzer = HuggingFaceAnalyzer(model_path=model_path, model_type=model_type,
+                                               quantization=kwargs.get('quantization'))
                 print("✅ HuggingFace模型加载成功")
                 return analyzer
             except ImportError as e:
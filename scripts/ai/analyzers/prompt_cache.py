@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词缓存模块
+为AI分析器提供精确匹配缓存和基于向量相似度的语义缓存，避免重复的API调用
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# 相似度计算时每次反量化的行数
+_SIMILARITY_BLOCK_ROWS = 4096
+
+
+class SemanticPromptCache:
+    """语义提示词缓存（基于嵌入向量余弦相似度）"""
+
+    def __init__(self, db_path: str = "data/cache/semantic_cache.sqlite3", threshold: float = 0.95):
+        """
+        初始化语义缓存
+
+        Args:
+            db_path: SQLite缓存文件路径
+            threshold: 命中阈值（余弦相似度，0.0-1.0）
+        """
+        self.db_path = db_path
+        self.threshold = threshold
+        # 命名空间 -> (INT8量化的归一化嵌入矩阵, 每行的缩放系数, 响应列表)
+        self._entries: Dict[str, Tuple[Optional[np.ndarray], Optional[np.ndarray], List[str]]] = {}
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                response TEXT NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_namespace ON entries (namespace)")
+        self.conn.commit()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        """L2归一化嵌入向量"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按行将FP32向量量化为INT8（每行一个缩放系数，内存占用降为1/4）
+
+        Args:
+            vectors: 形状为 (N, D) 的FP32矩阵
+
+        Returns:
+            (INT8矩阵, 形状为 (N,) 的缩放系数)
+        """
+        scales = np.max(np.abs(vectors), axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, np.newaxis]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _load_namespace(self, namespace: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], List[str]]:
+        """从磁盘加载某个命名空间的全部缓存条目"""
+        if namespace not in self._entries:
+            rows = self.conn.execute(
+                "SELECT embedding, response FROM entries WHERE namespace = ? ORDER BY id",
+                (namespace,)
+            ).fetchall()
+            if rows:
+                matrix, scales = self._quantize(np.stack([np.frombuffer(row[0], dtype=np.float32) for row in rows]))
+                responses = [row[1] for row in rows]
+            else:
+                matrix, scales, responses = None, None, []
+            self._entries[namespace] = (matrix, scales, responses)
+        return self._entries[namespace]
+
+    @staticmethod
+    def _similarities(matrix: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """计算查询向量与量化矩阵各行的余弦相似度（分块反量化，避免一次复制整个矩阵）"""
+        similarities = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], _SIMILARITY_BLOCK_ROWS):
+            block = matrix[start:start + _SIMILARITY_BLOCK_ROWS]
+            similarities[start:start + len(block)] = block.astype(np.float32) @ query
+        return similarities * scales
+
+    def lookup(self, namespace: str, embedding) -> Optional[str]:
+        """
+        查找语义相近的缓存响应
+
+        Args:
+            namespace: 命名空间（模型、参数等配置）
+            embedding: 提示词的嵌入向量
+
+        Returns:
+            命中时返回缓存的响应，否则返回None
+        """
+        matrix, scales, responses = self._load_namespace(namespace)
+        if matrix is None:
+            return None
+
+        query = self._normalize(embedding)
+        if query.shape[0] != matrix.shape[1]:
+            return None
+
+        similarities = self._similarities(matrix, scales, query)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return responses[best]
+        return None
+
+    def add(self, namespace: str, embedding, response: str):
+        """
+        添加缓存条目
+
+        Args:
+            namespace: 命名空间
+            embedding: 提示词的嵌入向量
+            response: API响应
+        """
+        vector = self._normalize(embedding)
+        self.conn.execute(
+            "INSERT INTO entries (namespace, embedding, response) VALUES (?, ?, ?)",
+            (namespace, vector.tobytes(), response)
+        )
+        self.conn.commit()
+
+        row, scale = self._quantize(vector[np.newaxis, :])
+        matrix, scales, responses = self._load_namespace(namespace)
+        if matrix is None:
+            matrix, scales = row, scale
+            responses = [response]
+        else:
+            matrix = np.vstack([matrix, row])
+            scales = np.concatenate([scales, scale])
+            responses = responses + [response]
+        self._entries[namespace] = (matrix, scales, responses)
+
+
+class ResponseCache:
+    """响应缓存（按请求参数的SHA-256精确匹配，持久化到磁盘）"""
+
+    def __init__(self, db_path: str = "data/cache/response_cache.sqlite3", ttl: float = 30 * 86400):
+        """
+        初始化响应缓存
+
+        Args:
+            db_path: SQLite缓存文件路径
+            ttl: 缓存有效期（秒），默认30天
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                fingerprint TEXT
+            )"""
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(responses)")}
+        if 'fingerprint' not in columns:
+            self.conn.execute("ALTER TABLE responses ADD COLUMN fingerprint TEXT")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """根据请求参数计算缓存键"""
+        return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str, fingerprint: Optional[str] = None) -> Optional[str]:
+        """
+        查找缓存响应
+
+        Args:
+            key: 缓存键
+            fingerprint: 当前的后端版本标识（可选，与条目记录的不一致时视为未命中）
+
+        Returns:
+            命中且未过期时返回缓存的响应，否则返回None
+        """
+        row = self.conn.execute(
+            "SELECT response, created_at, fingerprint FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if fingerprint and row[2] and row[2] != fingerprint:
+            return None
+        if self.ttl and time.time() - row[1] > self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        return row[0]
+
+    def set(self, key: str, response: str, fingerprint: Optional[str] = None):
+        """
+        写入缓存响应
+
+        Args:
+            key: 缓存键
+            response: API响应
+            fingerprint: 生成该响应的后端版本标识（可选）
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created_at, fingerprint) VALUES (?, ?, ?, ?)",
+            (key, response, time.time(), fingerprint)
+        )
+        self.conn.commit()
@@ -6,10 +6,31 @@
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional, Set
 from collections import defaultdict
 
 
+# 预编译的正则表达式
+_SENT_BODY_RE = re.compile(r'[^。！？]+')
+_PARA_SPLIT_RE = re.compile(r'\n\s*\n')
+_MISSING_CHARS_RE = re.compile(r'主要人物缺失: ([^（(]+)')
+_MISSING_TIME_RE = re.compile(r'时间设定丢失: (.+)')
+_MISSING_PLACE_RE = re.compile(r'地点设定丢失: (.+)')
+
+
+@lru_cache(maxsize=512)
+def _char_sentence_re(char: str):
+    """人物所在句子的正则（按人物名缓存）"""
+    return re.compile(rf'{re.escape(char)}[^。！？]*[。！？]')
+
+
+@lru_cache(maxsize=512)
+def _event_sentence_re(event_keyword: str):
+    """包含事件关键词的句子的正则（按关键词缓存）"""
+    return re.compile(rf'[^。！？]*{re.escape(event_keyword)}[^。！？]*[。！？]')
+
+
 class AutoFixer:
     """自动修复器"""
     
@@ -46,29 +67,19 @@ class AutoFixer:
         
         # 在原始文本中查找这些人物出现的上下文
         for char in missing_characters:
-            # 查找人物在原文中的出现位置
-            pattern = rf'{char}[^。！？]*[。！？]'
-            matches = list(re.finditer(pattern, original))
+            # 改写文本中已有这个人物时无需修复（先做这项廉价的检查，再扫描原文）
+            if char in fixed_text:
+                continue
             
-            if matches:
-                # 获取第一个匹配的上下文
-                match = matches[0]
-                context_sentence = match.group(0)
-                
-                # 检查改写文本中是否缺少这个人物
-                if char not in fixed_text:
-                    # 尝试在合适的位置插入
-                    # 查找相似的句子结构
-                    sentences = re.split(r'[。！？]', fixed_text)
-                    for i, sent in enumerate(sentences):
-                        # 如果句子结构相似，尝试插入人物
-                        if len(sent) > 10 and len(sent) < 100:
-                            # 在句子开头插入人物
-                            fixed_sentence = f"{char}{sent}"
-                            sentences[i] = fixed_sentence
-                            break
-                    
-                    fixed_text = '。'.join(sentences) + '。'
+            # 查找人物在原文中的出现位置（只需第一个匹配）
+            if _char_sentence_re(char).search(original):
+                # 尝试在合适的位置插入
+                # 查找第一个长度合适的句子，在句子开头插入人物（原有标点保持不变）
+                for sent in _SENT_BODY_RE.finditer(fixed_text):
+                    if 10 < sent.end() - sent.start() < 100:
+                        pos = sent.start()
+                        fixed_text = f"{fixed_text[:pos]}{char}{fixed_text[pos:]}"
+                        break
         
         return fixed_text
     
@@ -96,22 +107,18 @@ class AutoFixer:
         
         # 对于每个缺失的事件，尝试在改写文本中找到合适的位置插入
         for event_keyword in missing_events[:3]:  # 最多修复3个
-            # 在原文中查找包含该关键词的句子
-            pattern = rf'[^。！？]*{re.escape(event_keyword)}[^。！？]*[。！？]'
-            matches = list(re.finditer(pattern, original))
+            # 改写文本中已有这个事件时无需修复（先做这项廉价的检查，再扫描原文）
+            if event_keyword in fixed_text:
+                continue
             
-            if matches:
-                event_sentence = matches[0].group(0)
-                
-                # 检查改写文本中是否缺少这个事件
-                if event_keyword not in fixed_text:
-                    # 在改写文本的适当位置插入
-                    # 查找段落结尾
-                    paragraphs = re.split(r'\n\s*\n', fixed_text)
-                    if paragraphs:
-                        # 在最后一个段落末尾添加
-                        paragraphs[-1] += f"\n\n{event_sentence}"
-                        fixed_text = '\n\n'.join(paragraphs)
+            # 在原文中查找包含该关键词的句子（只需第一个匹配）
+            match = _event_sentence_re(event_keyword).search(original)
+            if match:
+                # 在改写文本的适当位置插入
+                # 查找段落结尾，在最后一个段落末尾添加
+                paragraphs = _PARA_SPLIT_RE.split(fixed_text)
+                paragraphs[-1] += f"\n\n{match.group(0)}"
+                fixed_text = '\n\n'.join(paragraphs)
         
         return fixed_text
     
@@ -184,7 +191,7 @@ class AutoFixer:
         for issue in issues:
             if '主要人物缺失' in issue:
                 # 提取缺失的人物
-                match = re.search(r'主要人物缺失: ([^（]+)', issue)
+                match = _MISSING_CHARS_RE.search(issue)
                 if match:
                     chars_str = match.group(1)
                     missing_chars.update([c.strip() for c in chars_str.split(',')])
@@ -192,11 +199,11 @@ class AutoFixer:
                 # 提取缺失的事件关键词
                 missing_events.append('关键')
             elif '时间设定丢失' in issue:
-                match = re.search(r'时间设定丢失: (.+)', issue)
+                match = _MISSING_TIME_RE.search(issue)
                 if match:
                     missing_settings['time'] = match.group(1)
             elif '地点设定丢失' in issue:
-                match = re.search(r'地点设定丢失: (.+)', issue)
+                match = _MISSING_PLACE_RE.search(issue)
                 if match:
                     missing_settings['place'] = match.group(1)
         
@@ -5,10 +5,190 @@
 用于检查改写和生成的内容是否保持逻辑一致性
 """
 
+import heapq
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import itemgetter
 from typing import Dict, List, Tuple, Set, Optional
 from collections import defaultdict, Counter
 
+import numpy as np
+
+try:
+    from ._patterns import (DEVELOP_TRIGGERS, PLACE_WORDS, TIMELINE_MARKERS, TURN_TRIGGERS,
+                            name_action_re, sentences_by_name, trigger_sentence_re)
+except ImportError:
+    from _patterns import (DEVELOP_TRIGGERS, PLACE_WORDS, TIMELINE_MARKERS, TURN_TRIGGERS,
+                           name_action_re, sentences_by_name, trigger_sentence_re)
+
+try:
+    import ahocorasick
+    _HAS_AC = True
+except ImportError:
+    _HAS_AC = False
+
+
+# 预编译的正则表达式
+_NAME_ACTION_RE = name_action_re('说|道|想|看|走|来|去|是|有|在')
+_SPEECH_RE = name_action_re('说|道|想')
+_PLOT_PATTERNS = (
+    trigger_sentence_re(TURN_TRIGGERS, 50),
+    trigger_sentence_re(DEVELOP_TRIGGERS, 50),
+)
+_TIME_SETTING_PATTERNS = (
+    re.compile(r'(古代|现代|未来|过去|现在|今天|明天|昨天)'),
+    re.compile(r'(\d+年|\d+月|\d+日)'),
+)
+_PLACE_SETTING_PATTERNS = (
+    re.compile(f'({PLACE_WORDS})'),
+)
+_TIMELINE_RE = re.compile(f'({TIMELINE_MARKERS})')
+_TIMELINE_ORDER_RE = re.compile(r'(第\d+天|第\d+章|后来|然后|接着)')
+_PLOT_KEYWORDS = ('发现', '知道', '决定', '开始', '结束', '突然', '终于')
+_TURNING_KEYWORDS = ('突然', '忽然', '但是', '然而')
+_PLOT_TYPE_NAMES = ('发展', '转折')  # 情节类型编码 -> 名称
+_EXCLUDE_NAMES = frozenset({'大家', '自己', '他们', '我们', '你们', '她们', '它们'})  # 不是人名的常见词
+_CHARACTER_SCAN_CHARS = 20000  # 提取人物时只分析前20000字符
+_PARALLEL_MIN_CHARS = 500000  # 改写章节总字数达到此值时才使用多进程检查（更小的小说进程启动开销大于收益）
+
+
+def _join_prefix(chapters: List[str], min_chars: int, separator: str = '\n\n') -> str:
+    """
+    只拼接足够的章节，使结果与 separator.join(chapters) 的前 min_chars 个字符相同
+    
+    Args:
+        chapters: 章节列表
+        min_chars: 至少需要的字符数
+        separator: 章节分隔符
+    
+    Returns:
+        拼接后的文本（全部章节都不足 min_chars 时即为完整拼接结果）
+    """
+    parts = []
+    length = 0
+    for chapter in chapters:
+        if parts:
+            length += len(separator)
+        parts.append(chapter)
+        length += len(chapter)
+        if length >= min_chars:
+            break
+    return separator.join(parts)
+
+
+def _build_keyword_automaton(keywords):
+    """用全部字面关键词建立Aho-Corasick自动机（未安装pyahocorasick时返回None）"""
+    if not _HAS_AC:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def _count_keywords(automaton, keywords, text: str) -> Counter:
+    """
+    一次扫描统计所有关键词在文本中的出现次数
+    
+    Args:
+        automaton: _build_keyword_automaton 建立的自动机（为None时逐个关键词统计）
+        keywords: 关键词列表
+        text: 文本
+    
+    Returns:
+        关键词 -> 出现次数
+    """
+    counts = Counter()
+    if automaton is not None:
+        for _, keyword in automaton.iter(text):
+            counts[keyword] += 1
+    else:
+        for keyword in keywords:
+            counts[keyword] = text.count(keyword)
+    return counts
+
+
+
+
+@dataclass
+class ChapterFeatures:
+    """一段文本中与一致性检查相关的特征（由 ConsistencyChecker._scan 一次扫描得到）"""
+    char_set: Set[str] = field(default_factory=set)  # 对话/动作前出现的人名
+    event_counts: Counter = field(default_factory=Counter)  # 关键词 -> 出现次数
+    settings_present: Set[str] = field(default_factory=set)  # 文本中出现的设定值
+    first_time_marker: Optional[str] = None  # 第一个时间标记
+    
+    def merge(self, later: 'ChapterFeatures'):
+        """
+        合并紧接在本段之后的一段文本的特征（结果与扫描两段拼接后的文本相同）
+        
+        Args:
+            later: 后一段文本的特征
+        """
+        self.char_set |= later.char_set
+        self.event_counts.update(later.event_counts)
+        self.settings_present |= later.settings_present
+        if self.first_time_marker is None:
+            self.first_time_marker = later.first_time_marker
+
+
+class StreamScanner:
+    """
+    流式生成时边生成边扫描改写文本
+    
+    每收到完整的句子就提取其特征，生成结束时只需扫描最后不完整的部分；
+    人名、关键词、时间标记都不跨越句末标点，因此按句切分的结果与整体扫描相同
+    """
+    
+    def __init__(self, checker: 'ConsistencyChecker', original_text: str):
+        """
+        初始化流式扫描器
+        
+        Args:
+            checker: 一致性检查器
+            original_text: 原始文本（在收到第一段输出时扫描，与后续生成重叠）
+        """
+        self._checker = checker
+        self._original_text = original_text
+        self.original_features = None
+        self.features = ChapterFeatures()
+        self._parts = []  # 收到的全部片段
+        self._pending = ''  # 尚未扫描的不完整句子
+    
+    def feed(self, delta: str):
+        """
+        接收一段生成的文本（可直接作为 on_token 回调）
+        
+        Args:
+            delta: 新生成的文本片段
+        """
+        if self.original_features is None:
+            self.original_features = self._checker._scan(self._original_text)
+        self._parts.append(delta)
+        
+        end = max(delta.rfind('。'), delta.rfind('！'), delta.rfind('？'), delta.rfind('\n'))
+        if end < 0:
+            self._pending += delta
+            return
+        self.features.merge(self._checker._scan(self._pending + delta[:end + 1]))
+        self._pending = delta[end + 1:]
+    
+    def finish(self) -> Tuple[str, ChapterFeatures]:
+        """
+        扫描剩余的不完整句子
+        
+        Returns:
+            (收到的完整文本, 改写文本的特征)
+        """
+        if self._pending:
+            self.features.merge(self._checker._scan(self._pending))
+            self._pending = ''
+        return ''.join(self._parts), self.features
+
 
 class ConsistencyChecker:
     """逻辑一致性检查器（增强版，支持可配置严格程度）"""
@@ -30,6 +210,37 @@ class ConsistencyChecker:
         self.character_threshold = 0.3 + 0.4 * self.strictness  # 0.3-0.7
         self.plot_threshold = 0.4 + 0.4 * self.strictness  # 0.4-0.8
         self.setting_threshold = 0.5 + 0.4 * self.strictness  # 0.5-0.9
+        
+        # 检查时用到的全部字面关键词（情节关键词 + 设定值）及其自动机，设定变化时重建
+        self._keywords = _PLOT_KEYWORDS
+        self._keyword_ac = _build_keyword_automaton(self._keywords)
+    
+    @property
+    def plot_points(self) -> List[Dict]:
+        """情节关键点（内部按列存储，访问时组装为字典列表）"""
+        return [
+            {'text': text, 'position': int(position), 'type': _PLOT_TYPE_NAMES[plot_type]}
+            for text, position, plot_type in zip(self._plot_text, self._plot_pos, self._plot_type)
+        ]
+    
+    @plot_points.setter
+    def plot_points(self, plot_points: List[Dict]):
+        self._plot_text = [point['text'] for point in plot_points]
+        self._plot_pos = np.array([point['position'] for point in plot_points], dtype=np.int64)
+        self._plot_type = np.array([_PLOT_TYPE_NAMES.index(point['type']) for point in plot_points], dtype=np.int8)
+    
+    @property
+    def timeline(self) -> List[Dict]:
+        """时间线（内部按列存储，访问时组装为字典列表）"""
+        return [
+            {'marker': marker, 'position': int(position)}
+            for marker, position in zip(self._timeline_marker, self._timeline_pos)
+        ]
+    
+    @timeline.setter
+    def timeline(self, timeline: List[Dict]):
+        self._timeline_marker = [item['marker'] for item in timeline]
+        self._timeline_pos = np.array([item['position'] for item in timeline], dtype=np.int64)
     
     def analyze_novel(self, content: str) -> Dict:
         """
@@ -45,13 +256,13 @@ class ConsistencyChecker:
         self.characters = self._extract_characters(content)
         
         # 提取情节关键点
-        self.plot_points = self._extract_plot_points(content)
+        self._plot_text, self._plot_pos, self._plot_type = self._extract_plot_points(content)
         
         # 提取设定信息
         self.settings = self._extract_settings(content)
         
         # 提取时间线
-        self.timeline = self._extract_timeline(content)
+        self._timeline_marker, self._timeline_pos = self._extract_timeline(content)
         
         return {
             'characters': self.characters,
@@ -63,7 +274,8 @@ class ConsistencyChecker:
     def check_consistency(self, 
                          original_text: str,
                          rewritten_text: str,
-                         context: Optional[Dict] = None) -> Tuple[bool, List[str]]:
+                         context: Optional[Dict] = None,
+                         stream: Optional[StreamScanner] = None) -> Tuple[bool, List[str]]:
         """
         检查改写文本的逻辑一致性
         
@@ -71,63 +283,122 @@ class ConsistencyChecker:
             original_text: 原始文本
             rewritten_text: 改写文本
             context: 上下文信息（可选）
+            stream: 生成改写文本时使用的流式扫描器（可选，收到的文本与改写文本一致时复用已提取的特征）
         
         Returns:
             (是否一致, 问题列表)
         """
+        # 原文和改写文本各扫描一遍，以下各项检查只读取扫描得到的特征
+        orig_feat = rew_feat = None
+        if stream is not None:
+            streamed_text, streamed_feat = stream.finish()
+            orig_feat = stream.original_features
+            if streamed_text == rewritten_text:
+                rew_feat = streamed_feat
+        if orig_feat is None:
+            orig_feat = self._scan(original_text)
+        if rew_feat is None:
+            rew_feat = self._scan(rewritten_text)
+        
         issues = []
         
         # 检查人物一致性
-        char_issues = self._check_character_consistency(original_text, rewritten_text)
+        char_issues = self._check_character_consistency(orig_feat, rew_feat)
         issues.extend(char_issues)
         
         # 检查情节一致性
-        plot_issues = self._check_plot_consistency(original_text, rewritten_text)
+        plot_issues = self._check_plot_consistency(orig_feat, rew_feat)
         issues.extend(plot_issues)
         
         # 检查设定一致性
-        setting_issues = self._check_setting_consistency(original_text, rewritten_text)
+        setting_issues = self._check_setting_consistency(orig_feat, rew_feat)
         issues.extend(setting_issues)
         
         # 检查时间线一致性
-        timeline_issues = self._check_timeline_consistency(original_text, rewritten_text)
+        timeline_issues = self._check_timeline_consistency(orig_feat, rew_feat)
         issues.extend(timeline_issues)
         
         # 检查前后文连贯性
-        coherence_issues = self._check_coherence(rewritten_text, context)
+        coherence_issues = self._check_coherence(rew_feat, context)
         issues.extend(coherence_issues)
         
         return len(issues) == 0, issues
     
+    def stream_scanner(self, original_text: str) -> StreamScanner:
+        """
+        创建流式扫描器，在改写文本生成过程中提前提取特征
+        
+        Args:
+            original_text: 原始文本
+        
+        Returns:
+            StreamScanner（其 feed 方法可作为 on_token 回调）
+        """
+        return StreamScanner(self, original_text)
+    
+    def _scan(self, text: str) -> ChapterFeatures:
+        """
+        扫描一遍文本，提取各项一致性检查需要的全部特征
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            ChapterFeatures
+        """
+        setting_values = tuple(
+            value for value in (self.settings.get('time'), self.settings.get('place')) if value
+        )
+        # 情节关键词和设定值共用一个自动机，设定变化时重建
+        keywords = _PLOT_KEYWORDS + tuple(value for value in setting_values if value not in _PLOT_KEYWORDS)
+        if keywords != self._keywords:
+            self._keywords = keywords
+            self._keyword_ac = _build_keyword_automaton(keywords)
+        event_counts = _count_keywords(self._keyword_ac, self._keywords, text)
+        
+        # 时间线检查只比较第一个时间标记
+        time_marker = _TIMELINE_ORDER_RE.search(text)
+        
+        return ChapterFeatures(
+            char_set=set(_SPEECH_RE.findall(text)),
+            event_counts=event_counts,
+            settings_present={value for value in setting_values if event_counts[value]},
+            first_time_marker=time_marker.group(0) if time_marker else None,
+        )
+    
     def _extract_characters(self, content: str) -> Dict[str, Dict]:
         """提取人物信息"""
         characters = {}
         
-        # 提取可能的姓名（2-3个中文字符）
-        name_pattern = r'([\u4e00-\u9fa5]{2,3})(?:说|道|想|看|走|来|去|是|有|在)'
-        matches = re.finditer(name_pattern, content[:20000])  # 分析前20000字符
+        # 提取可能的姓名（2-3个中文字符），计数在Counter内部完成
+        name_counter = Counter(_NAME_ACTION_RE.findall(content, 0, _CHARACTER_SCAN_CHARS))
         
-        name_counter = Counter()
-        for match in matches:
-            name = match.group(1)
-            # 排除常见词
-            if name not in ['大家', '自己', '他们', '我们', '你们', '她们', '它们']:
-                name_counter[name] += 1
+        # 排除常见词
+        for name in _EXCLUDE_NAMES:
+            name_counter.pop(name, None)
         
         # 获取主要人物（出现5次以上）
-        for name, count in name_counter.most_common(20):
-            if count >= 5:
-                characters[name] = {
-                    'name': name,
-                    'count': count,
-                    'first_appearance': content.find(name),
-                    'attributes': self._extract_character_attributes(content, name)
-                }
+        frequent = ((name, count) for name, count in name_counter.items() if count >= 5)
+        main_names = [name for name, count in heapq.nlargest(20, frequent, key=itemgetter(1))]
+        if not main_names:
+            return characters
+        
+        # 所有主要人物的句子一次扫描取出
+        name_sentences = sentences_by_name(content, main_names, endpos=10000)
+        
+        for name in main_names:
+            characters[name] = {
+                'name': name,
+                'count': name_counter[name],
+                'first_appearance': content.find(name),
+                'attributes': self._extract_character_attributes(content, name, name_sentences[name])
+            }
         
         return characters
     
-    def _extract_character_attributes(self, content: str, name: str) -> Dict:
-        """提取人物属性"""
+    def _extract_character_attributes(self, content: str, name: str,
+                                      sentences: Optional[List[str]] = None) -> Dict:
+        """提取人物属性（sentences为该人物所在的句子，未提供时从content中查找）"""
         attributes = {
             'gender': None,
             'age': None,
@@ -136,8 +407,8 @@ class ConsistencyChecker:
         }
         
         # 查找包含该人物的句子
-        pattern = rf'{name}[^。！？]*[。！？]'
-        sentences = re.findall(pattern, content[:10000])
+        if sentences is None:
+            sentences = sentences_by_name(content, [name], endpos=10000)[name]
         
         # 分析性别
         for sent in sentences[:10]:
@@ -158,26 +429,22 @@ class ConsistencyChecker:
         
         return attributes
     
-    def _extract_plot_points(self, content: str) -> List[Dict]:
-        """提取情节关键点"""
-        plot_points = []
-        
-        # 查找关键情节标记
-        key_patterns = [
-            r'(突然|忽然|终于|最后|然后|接着|但是|然而)[^。！？]{10,50}[。！？]',
-            r'(发现|知道|明白|决定|开始|结束)[^。！？]{10,50}[。！？]',
-        ]
-        
-        for pattern in key_patterns:
-            matches = re.finditer(pattern, content)
+    def _extract_plot_points(self, content: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """提取情节关键点，返回 (文本列表, 位置数组, 类型编码数组)"""
+        texts = []
+        positions = []
+        types = []
+        
+        # 查找关键情节标记（最多50个关键点，够数后不再继续扫描）
+        for pattern in _PLOT_PATTERNS:
+            matches = islice(pattern.finditer(content), max(0, 50 - len(texts)))
             for match in matches:
-                plot_points.append({
-                    'text': match.group(0),
-                    'position': match.start(),
-                    'type': '转折' if any(kw in match.group(0) for kw in ['突然', '忽然', '但是', '然而']) else '发展'
-                })
+                text = match.group(0)
+                texts.append(text)
+                positions.append(match.start())
+                types.append(1 if any(kw in text for kw in _TURNING_KEYWORDS) else 0)
         
-        return plot_points[:50]  # 最多50个关键点
+        return texts, np.array(positions, dtype=np.int64), np.array(types, dtype=np.int8)
     
     def _extract_settings(self, content: str) -> Dict:
         """提取设定信息"""
@@ -188,66 +455,51 @@ class ConsistencyChecker:
         }
         
         # 提取时间设定
-        time_patterns = [
-            r'(古代|现代|未来|过去|现在|今天|明天|昨天)',
-            r'(\d+年|\d+月|\d+日)',
-        ]
-        for pattern in time_patterns:
-            match = re.search(pattern, content[:5000])
+        for pattern in _TIME_SETTING_PATTERNS:
+            match = pattern.search(content, 0, 5000)
             if match:
                 settings['time'] = match.group(0)
                 break
         
         # 提取地点设定
-        place_patterns = [
-            r'(都市|城市|乡村|小镇|学校|公司|医院|咖啡厅|餐厅)',
-        ]
-        for pattern in place_patterns:
-            match = re.search(pattern, content[:5000])
+        for pattern in _PLACE_SETTING_PATTERNS:
+            match = pattern.search(content, 0, 5000)
             if match:
                 settings['place'] = match.group(0)
                 break
         
         return settings
     
-    def _extract_timeline(self, content: str) -> List[Dict]:
-        """提取时间线"""
-        timeline = []
-        
-        # 查找时间标记
-        time_patterns = [
-            r'(第\d+天|第\d+章|第\d+次|后来|然后|接着|之后|之前)',
-        ]
+    def _extract_timeline(self, content: str) -> Tuple[List[str], np.ndarray]:
+        """提取时间线，返回 (时间标记列表, 位置数组)"""
+        markers = []
+        positions = []
         
-        for pattern in time_patterns:
-            matches = re.finditer(pattern, content)
-            for match in matches:
-                timeline.append({
-                    'marker': match.group(0),
-                    'position': match.start()
-                })
+        # 查找时间标记（最多100个时间点）
+        for match in islice(_TIMELINE_RE.finditer(content), 100):
+            markers.append(match.group(0))
+            positions.append(match.start())
         
-        return timeline[:100]  # 最多100个时间点
+        return markers, np.array(positions, dtype=np.int64)
     
-    def _check_character_consistency(self, original: str, rewritten: str) -> List[str]:
+    def _check_character_consistency(self, orig_feat: ChapterFeatures, rew_feat: ChapterFeatures) -> List[str]:
         """检查人物一致性"""
         issues = []
         
-        # 提取原始文本中的人物
-        orig_chars = set(re.findall(r'([\u4e00-\u9fa5]{2,3})(?:说|道|想)', original))
-        rew_chars = set(re.findall(r'([\u4e00-\u9fa5]{2,3})(?:说|道|想)', rewritten))
+        orig_chars = orig_feat.char_set
+        rew_chars = rew_feat.char_set
         
         # 检查主要人物是否一致
         if self.characters:
-            main_chars = set(self.characters.keys())
-            orig_main = orig_chars & main_chars
-            rew_main = rew_chars & main_chars
+            # 直接与字典的键视图求交集，不再复制一份主要人物集合
+            orig_main = orig_chars & self.characters.keys()
             
             # 如果主要人物消失，可能是问题（基于严格程度）
             if orig_main:
-                missing_ratio = len(orig_main - rew_main) / len(orig_main)
+                # orig_main 已是主要人物，差集无需再与主要人物求交
+                missing = orig_main - rew_chars
+                missing_ratio = len(missing) / len(orig_main)
                 if missing_ratio > self.character_threshold:
-                    missing = orig_main - rew_main
                     issues.append(f"主要人物缺失: {', '.join(missing)} (缺失率: {missing_ratio*100:.1f}%)")
             
             # 如果出现新人物，需要检查
@@ -257,56 +509,50 @@ class ConsistencyChecker:
         
         return issues
     
-    def _check_plot_consistency(self, original: str, rewritten: str) -> List[str]:
+    def _check_plot_consistency(self, orig_feat: ChapterFeatures, rew_feat: ChapterFeatures) -> List[str]:
         """检查情节一致性"""
         issues = []
         
-        # 检查关键情节是否保留
-        key_events = ['发现', '知道', '决定', '开始', '结束', '突然', '终于']
-        
-        orig_events = [kw for kw in key_events if kw in original]
-        rew_events = [kw for kw in key_events if kw in rewritten]
+        # 检查关键情节是否保留（只需要出现的关键词个数）
+        orig_events = sum(1 for kw in _PLOT_KEYWORDS if orig_feat.event_counts[kw])
+        rew_events = sum(1 for kw in _PLOT_KEYWORDS if rew_feat.event_counts[kw])
         
         # 如果关键事件消失太多，可能是问题（基于严格程度）
-        if len(orig_events) > 0:
-            missing_ratio = 1 - len(rew_events) / len(orig_events)
+        if orig_events > 0:
+            missing_ratio = 1 - rew_events / orig_events
             if missing_ratio > self.plot_threshold:
                 issues.append(f"关键情节丢失过多: {missing_ratio*100:.1f}% (阈值: {self.plot_threshold*100:.1f}%)")
         
         return issues
     
-    def _check_setting_consistency(self, original: str, rewritten: str) -> List[str]:
+    def _check_setting_consistency(self, orig_feat: ChapterFeatures, rew_feat: ChapterFeatures) -> List[str]:
         """检查设定一致性"""
         issues = []
         
         # 检查时间设定
         if self.settings.get('time'):
-            if self.settings['time'] in original and self.settings['time'] not in rewritten:
+            if self.settings['time'] in orig_feat.settings_present and self.settings['time'] not in rew_feat.settings_present:
                 issues.append(f"时间设定丢失: {self.settings['time']}")
         
         # 检查地点设定
         if self.settings.get('place'):
-            if self.settings['place'] in original and self.settings['place'] not in rewritten:
+            if self.settings['place'] in orig_feat.settings_present and self.settings['place'] not in rew_feat.settings_present:
                 issues.append(f"地点设定丢失: {self.settings['place']}")
         
         return issues
     
-    def _check_timeline_consistency(self, original: str, rewritten: str) -> List[str]:
+    def _check_timeline_consistency(self, orig_feat: ChapterFeatures, rew_feat: ChapterFeatures) -> List[str]:
         """检查时间线一致性"""
         issues = []
         
-        # 检查时间标记的顺序
-        orig_times = re.findall(r'(第\d+天|第\d+章|后来|然后|接着)', original)
-        rew_times = re.findall(r'(第\d+天|第\d+章|后来|然后|接着)', rewritten)
-        
-        # 如果时间标记顺序改变，可能是问题
-        if len(orig_times) > 0 and len(rew_times) > 0:
-            if orig_times[0] != rew_times[0]:
+        # 检查时间标记的顺序：如果第一个时间标记改变，可能是问题
+        if orig_feat.first_time_marker and rew_feat.first_time_marker:
+            if orig_feat.first_time_marker != rew_feat.first_time_marker:
                 issues.append("时间线顺序可能改变")
         
         return issues
     
-    def _check_coherence(self, text: str, context: Optional[Dict] = None) -> List[str]:
+    def _check_coherence(self, rew_feat: ChapterFeatures, context: Optional[Dict] = None) -> List[str]:
         """检查前后文连贯性"""
         issues = []
         
@@ -315,7 +561,7 @@ class ConsistencyChecker:
         
         # 检查人物提及是否与上下文一致
         if 'characters' in context:
-            mentioned_chars = set(re.findall(r'([\u4e00-\u9fa5]{2,3})(?:说|道|想)', text))
+            mentioned_chars = rew_feat.char_set
             context_chars = set(context.get('characters', []))
             
             # 如果出现上下文中没有的人物，可能是问题
@@ -327,13 +573,16 @@ class ConsistencyChecker:
     
     def validate_rewritten_novel(self, 
                                  original_chapters: List[str],
-                                 rewritten_chapters: List[str]) -> Dict:
+                                 rewritten_chapters: List[str],
+                                 workers: Optional[int] = None) -> Dict:
         """
         验证整本改写小说的逻辑一致性
         
         Args:
             original_chapters: 原始章节列表
             rewritten_chapters: 改写章节列表
+            workers: 逐章检查使用的进程数（默认为CPU核数，1表示在当前进程中检查；
+                     未指定时改写章节总字数不足 _PARALLEL_MIN_CHARS 也在当前进程中检查）
         
         Returns:
             验证结果字典
@@ -350,10 +599,22 @@ class ConsistencyChecker:
         full_original = '\n\n'.join(original_chapters)
         self.analyze_novel(full_original)
         
-        # 检查每个章节
-        for i, (orig_ch, rew_ch) in enumerate(zip(original_chapters, rewritten_chapters)):
-            is_consistent, issues = self.check_consistency(orig_ch, rew_ch)
-            
+        # 检查每个章节（各章节互不依赖，小说较长时分发到多个进程）
+        pairs = list(zip(original_chapters, rewritten_chapters))
+        if workers is None and sum(map(len, rewritten_chapters)) < _PARALLEL_MIN_CHARS:
+            workers = 1
+        if len(pairs) < 2 or workers == 1:
+            chapter_results = [self.check_consistency(orig_ch, rew_ch) for orig_ch, rew_ch in pairs]
+        else:
+            workers = min(workers or os.cpu_count() or 1, len(pairs))
+            snapshot = (self.strictness, self.characters, self.settings)
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_chapter_worker,
+                                     initargs=(snapshot,)) as executor:
+                chapter_results = list(executor.map(_check_chapter_worker, pairs,
+                                                    chunksize=max(1, len(pairs) // (workers * 4))))
+        
+        for i, (is_consistent, issues) in enumerate(chapter_results):
             if is_consistent:
                 results['consistent_chapters'] += 1
             else:
@@ -363,8 +624,8 @@ class ConsistencyChecker:
                 })
         
         # 检查整本书的人物一致性
-        full_rewritten = '\n\n'.join(rewritten_chapters)
-        rew_characters = self._extract_characters(full_rewritten)
+        # _extract_characters 只读取前 _CHARACTER_SCAN_CHARS 个字符，无需拼接整本改写小说
+        rew_characters = self._extract_characters(_join_prefix(rewritten_chapters, _CHARACTER_SCAN_CHARS))
         
         # 比较人物
         orig_char_names = set(self.characters.keys())
@@ -380,3 +641,25 @@ class ConsistencyChecker:
         
         return results
 
+
+# 子进程中的检查器（由 _init_chapter_worker 根据主进程的分析结果重建）
+_worker_checker: Optional[ConsistencyChecker] = None
+
+
+def _init_chapter_worker(snapshot: Tuple[float, Dict, Dict]):
+    """
+    子进程初始化：用 (严格程度, 人物信息, 设定信息) 重建检查器
+    
+    Args:
+        snapshot: 主进程中 analyze_novel 之后的检查器状态
+    """
+    global _worker_checker
+    strictness, characters, settings = snapshot
+    _worker_checker = ConsistencyChecker(strictness)
+    _worker_checker.characters = characters
+    _worker_checker.settings = settings
+
+
+def _check_chapter_worker(pair: Tuple[str, str]) -> Tuple[bool, List[str]]:
+    """检查单个章节（模块级函数，便于在子进程中执行）"""
+    return _worker_checker.check_consistency(*pair)
@@ -5,9 +5,68 @@
 管理整本小说的上下文信息，确保改写和生成时保持逻辑一致性
 """
 
+import heapq
 import re
-from typing import Dict, List, Optional, Set
-from collections import defaultdict, Counter
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Set, Tuple
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    from ._patterns import (DEVELOP_TRIGGERS, EMPHASIS_TRIGGERS, PLACE_WORDS, TIMELINE_MARKERS, TURN_TRIGGERS,
+                            compile_linear, name_action_re, sentences_by_name, trigger_sentence_re)
+except ImportError:
+    from _patterns import (DEVELOP_TRIGGERS, EMPHASIS_TRIGGERS, PLACE_WORDS, TIMELINE_MARKERS, TURN_TRIGGERS,
+                           compile_linear, name_action_re, sentences_by_name, trigger_sentence_re)
+
+
+# 预编译的正则表达式
+_SPEECH_NAME_RE = name_action_re(
+    '说|道|问|答|喊|叫|想|看|听|走|来|去|是|有|在|笑|哭|怒|喜', r'(?=[，。！？：；\s]|$)'
+)
+_TEXT_NAME_RE = name_action_re('说|道|想|看|走|来|去')
+_KEYWORD_RE = re.compile(r'[\u4e00-\u9fa5]{2,4}')
+_PLOT_SUMMARY_PATTERNS = (
+    trigger_sentence_re(TURN_TRIGGERS, 100),
+    trigger_sentence_re(f'{DEVELOP_TRIGGERS}|完成', 100),
+    trigger_sentence_re(EMPHASIS_TRIGGERS, 100),
+)
+_TIME_SETTING_PATTERNS = (
+    re.compile(r'(古代|现代|未来|过去|现在|当代|近代|古代)'),
+    re.compile(r'(\d{4}年|\d+世纪)'),
+    re.compile(r'(今天|明天|昨天|现在|将来|过去)'),
+)
+_PLACE_SETTING_PATTERNS = (
+    re.compile(f'({PLACE_WORDS}|办公室|家里|家中)'),
+    re.compile(r'(北京|上海|广州|深圳|杭州|成都|武汉|西安|南京|重庆)'),
+)
+_WORLD_SETTING_PATTERNS = (
+    re.compile(r'(玄幻|武侠|科幻|都市|言情|历史|军事|游戏|竞技|仙侠)'),
+)
+_TIMELINE_PATTERNS = (
+    re.compile(f'({TIMELINE_MARKERS}|第二天|第三天)'),
+    re.compile(r'(早上|中午|下午|晚上|深夜|凌晨)'),
+    re.compile(r'(\d+月\d+日|\d+年\d+月)'),
+)
+_KEY_EVENT_PATTERNS = (
+    trigger_sentence_re('发生|出现|遇到|遇到|发现|知道|决定|开始|结束|完成', 80),
+    trigger_sentence_re(f'{EMPHASIS_TRIGGERS}|突然|忽然', 80),
+)
+_KEY_SENTENCE_RE = compile_linear(r'[^。！？]*(重要|关键|突然|终于|决定|发现)[^。！？]*[。！？]')
+# 不是人名的常见词
+_EXCLUDE_NAMES = frozenset({
+    '大家', '自己', '他们', '我们', '你们', '她们', '它们',
+    '什么', '怎么', '这样', '那样', '这个', '那个',
+    '今天', '明天', '昨天', '现在', '以后', '之前', '之后',
+})
+
+
+@lru_cache(maxsize=512)
+def _text_names(text: str) -> frozenset:
+    """文本中"XX说/道/..."形式出现的人名（按文本缓存，改写重试时同一段文本无需重复扫描）"""
+    return frozenset(_TEXT_NAME_RE.findall(text))
 
 
 class NovelContextManager:
@@ -20,6 +79,22 @@ class NovelContextManager:
         self.timeline = []  # 时间线
         self.key_events = []  # 关键事件
         self.chapter_summaries = []  # 章节摘要
+        self._plot_index = {}  # 情节关键词 -> 包含该关键词的情节要点序号（倒排索引）
+        self._plot_index_source = None  # 建立倒排索引时的 plot_summary
+        self._relevant_plot_cache = {}  # 文本前500字符 -> 相关情节要点
+    
+    @property
+    def timeline(self) -> List[Dict]:
+        """时间线（内部按列存储，访问时组装为字典列表）"""
+        return [
+            {'marker': marker, 'position': int(position), 'type': '时间标记'}
+            for marker, position in zip(self._timeline_marker, self._timeline_pos)
+        ]
+    
+    @timeline.setter
+    def timeline(self, timeline: List[Dict]):
+        self._timeline_marker = [item['marker'] for item in timeline]
+        self._timeline_pos = np.array([item['position'] for item in timeline], dtype=np.int64)
     
     def build_context(self, novel_content: str, chapters: Optional[List[str]] = None) -> Dict:
         """
@@ -57,12 +132,13 @@ class NovelContextManager:
         # 提取情节摘要
         self.plot_summary = self._extract_plot_summary(novel_content)
         print(f"   提取到 {len(self.plot_summary)} 个情节要点")
+        self._build_plot_index()
         
         # 提取设定信息
         self.settings = self._extract_settings(novel_content)
         
         # 提取时间线
-        self.timeline = self._extract_timeline(novel_content)
+        self._timeline_marker, self._timeline_pos = self._extract_timeline(novel_content)
         
         # 提取关键事件
         self.key_events = self._extract_key_events(novel_content)
@@ -175,43 +251,50 @@ class NovelContextManager:
         characters = {}
         
         # 方法1: 查找"XX说"、"XX道"等模式（改进版，更精确）
-        speech_pattern = r'([\u4e00-\u9fa5]{2,3})(?:说|道|问|答|喊|叫|想|看|听|走|来|去|是|有|在|笑|哭|怒|喜)(?=[，。！？：；\s]|$)'
-        matches = re.finditer(speech_pattern, content[:50000])  # 分析前50000字符
+        matches = _SPEECH_NAME_RE.finditer(content, 0, 50000)  # 分析前50000字符
         
-        name_counter = Counter()
-        name_positions = defaultdict(list)
+        # 每个名字只记录出现位置列表，出现次数即列表长度（循环体内只做一次字典查找）
+        name_positions = {}
         
         for match in matches:
             name = match.group(1)
             # 排除常见词
-            exclude_words = {
-                '大家', '自己', '他们', '我们', '你们', '她们', '它们',
-                '什么', '怎么', '这样', '那样', '这个', '那个',
-                '今天', '明天', '昨天', '现在', '以后', '之前', '之后',
-            }
-            if name not in exclude_words:
-                name_counter[name] += 1
-                name_positions[name].append(match.start())
+            if name not in _EXCLUDE_NAMES:
+                positions = name_positions.get(name)
+                if positions is None:
+                    name_positions[name] = [match.start()]
+                else:
+                    positions.append(match.start())
         
         # 获取主要人物（出现10次以上，且分布在不同位置）
-        for name, count in name_counter.most_common(30):
-            if count >= 10:
-                positions = name_positions[name]
-                # 检查分布（如果都在前1000字符，可能是误识别）
-                if len(positions) > 5 and max(positions) - min(positions) > 1000:
-                    characters[name] = {
-                        'name': name,
-                        'count': count,
-                        'first_appearance': min(positions),
-                        'last_appearance': max(positions),
-                        'distribution': len(set(p // 5000 for p in positions)),  # 分布在多少个5000字符块中
-                        'attributes': self._extract_character_attributes(content, name)
-                    }
+        # 先按次数过滤再取前30个，结果和顺序与 most_common(30) 后再过滤一致
+        main_names = []
+        frequent = ((name, len(positions)) for name, positions in name_positions.items() if len(positions) >= 10)
+        for name, count in heapq.nlargest(30, frequent, key=itemgetter(1)):
+            positions = name_positions[name]
+            # 检查分布（如果都在前1000字符，可能是误识别）；位置按出现顺序记录，首尾即最小、最大值
+            if len(positions) > 5 and positions[-1] - positions[0] > 1000:
+                main_names.append(name)
+        
+        # 所有主要人物的句子一次扫描取出
+        name_sentences = sentences_by_name(content, main_names, max_len=50, endpos=20000)
+        
+        for name in main_names:
+            positions = np.asarray(name_positions[name], dtype=np.int64)
+            characters[name] = {
+                'name': name,
+                'count': len(name_positions[name]),
+                'first_appearance': int(positions[0]),
+                'last_appearance': int(positions[-1]),
+                'distribution': int(np.unique(positions // 5000).size),  # 分布在多少个5000字符块中
+                'attributes': self._extract_character_attributes(content, name, name_sentences[name])
+            }
         
         return characters
     
-    def _extract_character_attributes(self, content: str, name: str) -> Dict:
-        """提取人物属性（增强版）"""
+    def _extract_character_attributes(self, content: str, name: str,
+                                      sentences: Optional[List[str]] = None) -> Dict:
+        """提取人物属性（增强版，sentences为该人物所在的句子，未提供时从content中查找）"""
         attributes = {
             'gender': None,
             'age': None,
@@ -221,8 +304,8 @@ class NovelContextManager:
         }
         
         # 查找包含该人物的句子
-        pattern = rf'{name}[^。！？]{0,50}[。！？]'
-        sentences = re.findall(pattern, content[:20000])
+        if sentences is None:
+            sentences = sentences_by_name(content, [name], max_len=50, endpos=20000)[name]
         
         if not sentences:
             return attributes
@@ -257,14 +340,8 @@ class NovelContextManager:
         plot_points = []
         
         # 查找关键情节标记
-        key_patterns = [
-            r'(突然|忽然|终于|最后|然后|接着|但是|然而)[^。！？]{10,100}[。！？]',
-            r'(发现|知道|明白|决定|开始|结束|完成)[^。！？]{10,100}[。！？]',
-            r'(重要|关键|转折|变化)[^。！？]{10,100}[。！？]',
-        ]
-        
-        for pattern in key_patterns:
-            matches = re.finditer(pattern, content)
+        for pattern in _PLOT_SUMMARY_PATTERNS:
+            matches = pattern.finditer(content)
             for match in matches:
                 plot_text = match.group(0).strip()
                 if len(plot_text) > 20 and len(plot_text) < 150:  # 合理长度
@@ -286,34 +363,22 @@ class NovelContextManager:
         }
         
         # 提取时间设定
-        time_patterns = [
-            r'(古代|现代|未来|过去|现在|当代|近代|古代)',
-            r'(\d{4}年|\d+世纪)',
-            r'(今天|明天|昨天|现在|将来|过去)',
-        ]
-        for pattern in time_patterns:
-            match = re.search(pattern, content[:10000])
+        for pattern in _TIME_SETTING_PATTERNS:
+            match = pattern.search(content, 0, 10000)
             if match:
                 settings['time'] = match.group(0)
                 break
         
         # 提取地点设定
-        place_patterns = [
-            r'(都市|城市|乡村|小镇|学校|公司|医院|咖啡厅|餐厅|办公室|家里|家中)',
-            r'(北京|上海|广州|深圳|杭州|成都|武汉|西安|南京|重庆)',
-        ]
-        for pattern in place_patterns:
-            match = re.search(pattern, content[:10000])
+        for pattern in _PLACE_SETTING_PATTERNS:
+            match = pattern.search(content, 0, 10000)
             if match:
                 settings['place'] = match.group(0)
                 break
         
         # 提取世界观设定
-        world_patterns = [
-            r'(玄幻|武侠|科幻|都市|言情|历史|军事|游戏|竞技|仙侠)',
-        ]
-        for pattern in world_patterns:
-            match = re.search(pattern, content[:5000])
+        for pattern in _WORLD_SETTING_PATTERNS:
+            match = pattern.search(content, 0, 5000)
             if match:
                 settings['world'] = match.group(0)
                 settings['genre'] = match.group(0)
@@ -321,44 +386,31 @@ class NovelContextManager:
         
         return settings
     
-    def _extract_timeline(self, content: str) -> List[Dict]:
-        """提取时间线（增强版）"""
-        timeline = []
+    def _extract_timeline(self, content: str) -> Tuple[List[str], np.ndarray]:
+        """提取时间线（增强版），返回 (时间标记列表, 位置数组)"""
+        markers = []
+        positions = []
         
         # 查找时间标记
-        time_patterns = [
-            r'(第\d+天|第\d+章|第\d+次|后来|然后|接着|之后|之前|第二天|第三天)',
-            r'(早上|中午|下午|晚上|深夜|凌晨)',
-            r'(\d+月\d+日|\d+年\d+月)',
-        ]
-        
-        for pattern in time_patterns:
-            matches = re.finditer(pattern, content)
+        for pattern in _TIMELINE_PATTERNS:
+            matches = pattern.finditer(content)
             for match in matches:
-                timeline.append({
-                    'marker': match.group(0),
-                    'position': match.start(),
-                    'type': '时间标记'
-                })
-                if len(timeline) >= 200:
+                markers.append(match.group(0))
+                positions.append(match.start())
+                if len(markers) >= 200:
                     break
-            if len(timeline) >= 200:
+            if len(markers) >= 200:
                 break
         
-        return timeline
+        return markers, np.array(positions, dtype=np.int64)
     
     def _extract_key_events(self, content: str) -> List[str]:
         """提取关键事件"""
         events = []
         
         # 查找关键事件标记
-        event_patterns = [
-            r'(发生|出现|遇到|遇到|发现|知道|决定|开始|结束|完成)[^。！？]{10,80}[。！？]',
-            r'(重要|关键|转折|变化|突然|忽然)[^。！？]{10,80}[。！？]',
-        ]
-        
-        for pattern in event_patterns:
-            matches = re.finditer(pattern, content)
+        for pattern in _KEY_EVENT_PATTERNS:
+            matches = pattern.finditer(content)
             for match in matches:
                 event_text = match.group(0).strip()
                 if 20 < len(event_text) < 120:
@@ -379,9 +431,9 @@ class NovelContextManager:
             summary = chapter[:200] if len(chapter) > 200 else chapter
             
             # 查找关键句
-            key_sentences = re.findall(r'[^。！？]*(重要|关键|突然|终于|决定|发现)[^。！？]*[。！？]', chapter)
-            if key_sentences:
-                summary += " | " + key_sentences[0]
+            key_sentence = _KEY_SENTENCE_RE.search(chapter)
+            if key_sentence:
+                summary += " | " + key_sentence.group(1)
             
             summaries.append(summary[:300])  # 限制长度
         
@@ -389,26 +441,42 @@ class NovelContextManager:
     
     def _extract_characters_from_text(self, text: str) -> Set[str]:
         """从文本中提取人物"""
-        pattern = r'([\u4e00-\u9fa5]{2,3})(?:说|道|想|看|走|来|去)'
-        matches = re.findall(pattern, text)
-        return set(matches)
+        return _text_names(text)
+    
+    def _build_plot_index(self):
+        """为情节要点建立 关键词 -> 情节序号 的倒排索引"""
+        plot_index = defaultdict(list)
+        for idx, plot in enumerate(self.plot_summary):
+            for keyword in set(_KEYWORD_RE.findall(plot)):
+                plot_index[keyword].append(idx)
+        self._plot_index = dict(plot_index)
+        self._plot_index_source = (self.plot_summary, len(self.plot_summary))
+        self._relevant_plot_cache = {}
     
     def _get_relevant_plots(self, text: str) -> List[str]:
         """获取相关的情节要点"""
-        relevant = []
+        # plot_summary 被替换或修改过时重建倒排索引
+        source = self._plot_index_source
+        if source is None or source[0] is not self.plot_summary or source[1] != len(self.plot_summary):
+            self._build_plot_index()
+        
+        # 只有前500字符参与匹配，以此为键缓存结果
+        cache_key = text[:500]
+        cached = self._relevant_plot_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
         
         # 查找文本中的关键词
-        keywords = re.findall(r'[\u4e00-\u9fa5]{2,4}', text[:500])
-        keyword_set = set(keywords)
-        
-        # 匹配情节要点
-        for plot in self.plot_summary:
-            plot_keywords = set(re.findall(r'[\u4e00-\u9fa5]{2,4}', plot))
-            # 如果有共同关键词，认为是相关的
-            if keyword_set & plot_keywords:
-                relevant.append(plot)
-                if len(relevant) >= 3:
-                    break
+        keyword_set = set(_KEYWORD_RE.findall(cache_key))
+        
+        # 有共同关键词的情节认为是相关的，按原顺序取前3个
+        candidates = set()
+        for keyword in keyword_set:
+            candidates.update(self._plot_index.get(keyword, ()))
         
+        relevant = [self.plot_summary[idx] for idx in sorted(candidates)[:3]]
+        if len(self._relevant_plot_cache) >= 512:
+            self._relevant_plot_cache.clear()
+        self._relevant_plot_cache[cache_key] = tuple(relevant)
         return relevant
 
@@ -5,65 +5,74 @@ AI与创意处理模块集成
 提供统一的接口，整合深度学习和改写功能
 """
 
+from functools import lru_cache
 from typing import Optional, Dict, List, Tuple
+import asyncio
+import hashlib
+import importlib
+import inspect
 import os
 import sys
+import time
+import traceback
+from collections import deque
 
-# 导入上下文管理器和一致性检查器
-try:
-    from .context_manager import NovelContextManager
-    from .consistency_checker import ConsistencyChecker
-except ImportError:
-    try:
-        from scripts.ai.context_manager import NovelContextManager
-        from scripts.ai.consistency_checker import ConsistencyChecker
-    except ImportError:
-        NovelContextManager = None
-        ConsistencyChecker = None
+# scripts 目录：相对导入和 scripts.* 都不可用时，加入 sys.path 后按 ai.* / creative.* 导入
+_SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# 添加路径以便导入
-parent_dir = os.path.dirname(os.path.dirname(__file__))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+# 依赖名称 -> 依次尝试导入的模块，首次使用时才导入
+_LAZY_DEPENDENCIES = {
+    'NovelContextManager': ('.context_manager', 'scripts.ai.context_manager', 'ai.context_manager'),
+    'ConsistencyChecker': ('.consistency_checker', 'scripts.ai.consistency_checker', 'ai.consistency_checker'),
+    'AutoFixer': ('.auto_fixer', 'scripts.ai.auto_fixer', 'ai.auto_fixer'),
+    'AIAnalyzerFactory': ('.analyzers.ai_analyzer', 'scripts.ai.analyzers.ai_analyzer', 'ai.analyzers.ai_analyzer'),
+    'NaturalStyleRewriter': ('..creative.processors.text_processor',
+                             'scripts.creative.processors.text_processor',
+                             'creative.processors.text_processor'),
+    'ContentGenerator': ('..creative.generators.generate_content',
+                         'scripts.creative.generators.generate_content',
+                         'creative.generators.generate_content'),
+}
 
-# 导入AI分析器
-try:
-    from .analyzers.ai_analyzer import AIAnalyzerFactory
-except ImportError:
-    try:
-        from scripts.ai.analyzers.ai_analyzer import AIAnalyzerFactory
-    except ImportError:
-        try:
-            sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'analyzers'))
-            from ai_analyzer import AIAnalyzerFactory
-        except ImportError:
-            AIAnalyzerFactory = None
 
-# 导入传统改写器
-try:
-    from ..creative.processors.text_processor import NaturalStyleRewriter
-except ImportError:
-    try:
-        from scripts.creative.processors.text_processor import NaturalStyleRewriter
-    except ImportError:
+@lru_cache(maxsize=None)
+def _load_dependency(name: str):
+    """
+    按需导入依赖（结果缓存，每个依赖只尝试导入一次）
+    
+    Args:
+        name: 依赖名称（_LAZY_DEPENDENCIES 的键）
+    
+    Returns:
+        导入的类，都导入失败时返回None
+    """
+    for module_name in _LAZY_DEPENDENCIES[name]:
+        if not module_name.startswith(('.', 'scripts.')) and _SCRIPTS_DIR not in sys.path:
+            sys.path.insert(0, _SCRIPTS_DIR)
         try:
-            sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'creative', 'processors'))
-            from text_processor import NaturalStyleRewriter
-        except ImportError:
-            NaturalStyleRewriter = None
+            return getattr(importlib.import_module(module_name, __package__), name)
+        except (ImportError, TypeError):
+            # TypeError: 不在包内运行时无法使用相对导入
+            continue
+    return None
+
+
+# analyze/rewrite 结果缓存的最大条目数（GETBOOK_CACHE=0 时关闭缓存）
+_CACHE_SIZE = 128
+
 
-# 导入内容生成器
-try:
-    from ..creative.generators.generate_content import ContentGenerator
-except ImportError:
+def _content_key(*parts) -> str:
+    """按内容计算缓存键（sha256，避免长文本常驻在键中）"""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _in_event_loop() -> bool:
+    """当前线程是否正在运行事件循环（此时不能再调用 asyncio.run）"""
     try:
-        from scripts.creative.generators.generate_content import ContentGenerator
-    except ImportError:
-        try:
-            sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'creative', 'generators'))
-            from generate_content import ContentGenerator
-        except ImportError:
-            ContentGenerator = None
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
 
 
 class UnifiedRewriter:
@@ -72,6 +81,12 @@ class UnifiedRewriter:
     整合AI分析和传统改写方法，支持逻辑一致性检查
     """
     
+    MIN_REWRITE_CHARS = 16  # 去掉首尾空白后短于此长度的文本（如章节分隔符）原样返回
+    MIN_ANALYZE_CHARS = 128  # 短于此长度的内容不做AI分析
+    AI_FAILURE_LIMIT = 3  # AI改写在 AI_FAILURE_WINDOW 秒内失败超过此次数时暂停使用AI
+    AI_FAILURE_WINDOW = 60.0
+    AI_COOLDOWN = 60.0  # 暂停使用AI的秒数，期间直接使用传统方法
+    
     def __init__(self, 
                  ai_type: str = "tensorflow",
                  ai_model_path: Optional[str] = None,
@@ -90,12 +105,19 @@ class UnifiedRewriter:
         self.use_hybrid = use_hybrid
         self.check_consistency = check_consistency
         
+        # 同一内容重复分析/改写时直接返回缓存结果（LRU，按内容哈希）
+        self.use_cache = os.environ.get('GETBOOK_CACHE', '1') == '1'
+        self._analyze_cache = {}
+        self._rewrite_cache = {}
+        
         # 初始化上下文管理器和一致性检查器
+        NovelContextManager = _load_dependency('NovelContextManager')
         if NovelContextManager:
             self.context_manager = NovelContextManager()
         else:
             self.context_manager = None
         
+        ConsistencyChecker = _load_dependency('ConsistencyChecker')
         if ConsistencyChecker:
             self.consistency_checker = ConsistencyChecker()
         else:
@@ -103,7 +125,8 @@ class UnifiedRewriter:
         
         # 初始化AI分析器
         self.ai_analyzer = None
-        if ai_type != "offline" and AIAnalyzerFactory:
+        AIAnalyzerFactory = _load_dependency('AIAnalyzerFactory') if ai_type != "offline" else None
+        if AIAnalyzerFactory:
             try:
                 kwargs = {}
                 if ai_type == "tensorflow" and ai_model_path:
@@ -117,7 +140,16 @@ class UnifiedRewriter:
                 print(f"⚠️  无法初始化AI分析器: {e}")
                 self.ai_analyzer = None
         
+        # 支持流式输出的分析器在生成过程中就开始一致性检查的扫描
+        self._ai_streams = False
+        if self.ai_analyzer is not None:
+            try:
+                self._ai_streams = 'on_token' in inspect.signature(self.ai_analyzer.rewrite_text).parameters
+            except (TypeError, ValueError):
+                pass
+        
         # 初始化传统改写器
+        NaturalStyleRewriter = _load_dependency('NaturalStyleRewriter')
         if NaturalStyleRewriter:
             try:
                 self.natural_rewriter = NaturalStyleRewriter()
@@ -126,6 +158,77 @@ class UnifiedRewriter:
                 self.natural_rewriter = None
         else:
             self.natural_rewriter = None
+        
+        # 传统改写方法只查找一次（优先 rewrite_naturally(text, style)，其次 rewrite(text, style=style)）
+        self._rewrite_fn = getattr(self.natural_rewriter, 'rewrite_naturally', None)
+        self._rewrite_style_positional = self._rewrite_fn is not None
+        if self._rewrite_fn is None:
+            self._rewrite_fn = getattr(self.natural_rewriter, 'rewrite', None)
+        
+        # 内容生成器和自动修复器在首次使用时创建，之后复用
+        self._content_generator = None
+        self._auto_fixer = None
+        
+        # AI改写的熔断状态：模型持续出错时不再逐章重复失败的调用
+        self._ai_failures = deque()  # 最近失败的时间
+        self._ai_failure_count = 0  # 累计失败次数
+        self._ai_disabled_until = 0.0
+    
+    def _ai_available(self) -> bool:
+        """AI分析器是否可用（未初始化或处于熔断暂停期时不可用）"""
+        return self.ai_analyzer is not None and time.time() >= self._ai_disabled_until
+    
+    def _record_ai_failure(self):
+        """记录一次AI改写失败，最近失败过多时暂停使用AI"""
+        now = time.time()
+        self._ai_failure_count += 1
+        self._ai_failures.append(now)
+        while self._ai_failures[0] < now - self.AI_FAILURE_WINDOW:
+            self._ai_failures.popleft()
+        
+        if len(self._ai_failures) > self.AI_FAILURE_LIMIT:
+            self._ai_failures.clear()
+            self._ai_disabled_until = now + self.AI_COOLDOWN
+            print(f"⚠️  AI改写频繁失败，{self.AI_COOLDOWN:.0f}秒内改用传统方法")
+    
+    def _natural_rewrite(self, text: str, style: str) -> str:
+        """
+        使用传统改写器改写（调用前需确认 self._rewrite_fn 可用）
+        
+        Args:
+            text: 原始文本
+            style: 目标风格
+        
+        Returns:
+            改写后的文本
+        """
+        if self._rewrite_style_positional:
+            return self._rewrite_fn(text, style)
+        return self._rewrite_fn(text, style=style)
+    
+    def _get_auto_fixer(self):
+        """获取自动修复器（首次调用时创建）"""
+        if self._auto_fixer is None:
+            AutoFixer = _load_dependency('AutoFixer')
+            if AutoFixer is None:
+                raise ImportError("无法导入自动修复模块")
+            self._auto_fixer = AutoFixer(context_manager=self.context_manager)
+        return self._auto_fixer
+    
+    @staticmethod
+    def _cache_get(cache: Dict, key: str):
+        """读取缓存并标记为最近使用"""
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+        return value
+    
+    @staticmethod
+    def _cache_put(cache: Dict, key: str, value):
+        """写入缓存，超过上限时淘汰最久未使用的条目"""
+        if len(cache) >= _CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[key] = value
     
     def rewrite(self, 
                 text: str, 
@@ -136,7 +239,53 @@ class UnifiedRewriter:
                 novel_context: Optional[Dict] = None,
                 chapter_num: int = 0) -> str:
         """
-        改写文本（统一接口，支持逻辑一致性检查）
+        改写文本（统一接口，支持逻辑一致性检查，相同输入的结果会被缓存）
+        
+        Args:
+            text: 原始文本
+            style: 目标风格
+            perspective: 视角（可选）
+            context: 上下文（可选）
+            use_ai: 是否使用AI
+            novel_context: 整本小说的上下文信息（可选）
+            chapter_num: 章节号（用于上下文管理）
+        
+        Returns:
+            改写后的文本
+        """
+        if not text:
+            return ""
+        
+        # 空白、标点、分隔符等过短的文本不值得改写，不进入上下文增强和AI调用
+        if len(text.strip()) < self.MIN_REWRITE_CHARS:
+            return text
+        
+        # 带小说上下文时结果还取决于上下文管理器的状态，不缓存
+        if not self.use_cache or novel_context:
+            return self._rewrite(text, style, perspective, context, use_ai, novel_context, chapter_num)
+        
+        key = _content_key(text, style, perspective, context, use_ai)
+        cached = self._cache_get(self._rewrite_cache, key)
+        if cached is None:
+            # 本次AI调用失败或AI处于熔断暂停期时，降级得到的结果不缓存
+            # 未配置AI分析器时传统方法的结果就是最终结果，照常缓存
+            failures_before = self._ai_failure_count
+            ai_paused = use_ai and self.ai_analyzer is not None and not self._ai_available()
+            cached = self._rewrite(text, style, perspective, context, use_ai)
+            if not ai_paused and self._ai_failure_count == failures_before:
+                self._cache_put(self._rewrite_cache, key, cached)
+        return cached
+    
+    def _rewrite(self, 
+                 text: str, 
+                 style: str,
+                 perspective: Optional[str] = None,
+                 context: Optional[str] = None,
+                 use_ai: bool = True,
+                 novel_context: Optional[Dict] = None,
+                 chapter_num: int = 0) -> str:
+        """
+        改写文本（不经过缓存）
         
         Args:
             text: 原始文本
@@ -160,36 +309,47 @@ class UnifiedRewriter:
                 novel_ctx_str = self.context_manager.get_context_for_rewrite(
                     text, chapter_num=chapter_num
                 )
-                if enhanced_context:
-                    enhanced_context = f"{enhanced_context} | {novel_ctx_str}"
-                else:
-                    enhanced_context = novel_ctx_str
+                if novel_ctx_str:
+                    if enhanced_context:
+                        enhanced_context = f"{enhanced_context} | {novel_ctx_str}"
+                    else:
+                        enhanced_context = novel_ctx_str
             except Exception as e:
                 print(f"⚠️  上下文增强失败: {e}")
         
         # 如果使用AI且AI可用
-        if use_ai and self.ai_analyzer:
+        if use_ai and self._ai_available():
             try:
+                # 流式生成时，每收到完整的句子就提取一致性检查需要的特征，与生成过程重叠
+                stream = None
+                stream_kwargs = {}
+                if self._ai_streams and self.check_consistency and self.consistency_checker:
+                    stream = self.consistency_checker.stream_scanner(text)
+                    stream_kwargs['on_token'] = stream.feed
+                
                 # 使用AI改写（传入增强的上下文）
                 ai_result = self.ai_analyzer.rewrite_text(
                     text=text,
                     style=style,
                     perspective=perspective,
-                    context=enhanced_context
+                    context=enhanced_context,
+                    **stream_kwargs
                 )
+                # 分析器内部吞掉错误时（如API调用失败）返回空结果或原文，同样按失败处理：计入熔断，结果不缓存
+                if not ai_result or ai_result == text:
+                    raise RuntimeError("AI未返回改写结果")
                 
                 # 检查逻辑一致性
                 if self.check_consistency and self.consistency_checker and ai_result:
                     is_consistent, issues = self.consistency_checker.check_consistency(
-                        text, ai_result, novel_context
+                        text, ai_result, novel_context, stream=stream
                     )
                     if not is_consistent and len(issues) > 0:
                         print(f"⚠️  检测到逻辑一致性问题: {', '.join(issues[:3])}")
                         
                         # 尝试自动修复
                         try:
-                            from .auto_fixer import AutoFixer
-                            fixer = AutoFixer(context_manager=self.context_manager if hasattr(self, 'context_manager') else None)
+                            fixer = self._get_auto_fixer()
                             fixed_result, fix_report = fixer.auto_fix(
                                 text, ai_result, issues, novel_context
                             )
@@ -200,8 +360,7 @@ class UnifiedRewriter:
                             print(f"⚠️  自动修复失败: {e}")
                             # 提供修复建议
                             try:
-                                from .auto_fixer import AutoFixer
-                                fixer = AutoFixer()
+                                fixer = self._get_auto_fixer()
                                 suggestions = fixer.suggest_fixes(issues, novel_context)
                                 if suggestions:
                                     print(f"💡 修复建议: {suggestions[0]}")
@@ -209,21 +368,10 @@ class UnifiedRewriter:
                                 pass
                 
                 # 混合模式：AI改写后，再用传统方法微调
-                if self.use_hybrid and self.natural_rewriter and ai_result:
+                if self.use_hybrid and self._rewrite_fn and ai_result:
                     try:
                         # 对AI结果进行微调
-                        if hasattr(self.natural_rewriter, 'rewrite_naturally'):
-                            final_result = self.natural_rewriter.rewrite_naturally(
-                                ai_result,
-                                style
-                            )
-                        elif hasattr(self.natural_rewriter, 'rewrite'):
-                            final_result = self.natural_rewriter.rewrite(
-                                ai_result,
-                                style=style
-                            )
-                        else:
-                            final_result = ai_result
+                        final_result = self._natural_rewrite(ai_result, style)
                         return final_result if final_result else ai_result
                     except Exception as e:
                         print(f"⚠️  混合模式微调失败: {e}")
@@ -233,24 +381,19 @@ class UnifiedRewriter:
                 
             except Exception as e:
                 print(f"⚠️  AI改写失败: {e}，使用传统方法")
+                self._record_ai_failure()
                 # 降级到传统方法
-                if self.natural_rewriter:
+                if self._rewrite_fn:
                     try:
-                        if hasattr(self.natural_rewriter, 'rewrite_naturally'):
-                            return self.natural_rewriter.rewrite_naturally(text, style)
-                        elif hasattr(self.natural_rewriter, 'rewrite'):
-                            return self.natural_rewriter.rewrite(text, style=style)
+                        return self._natural_rewrite(text, style)
                     except Exception as e2:
                         print(f"⚠️  传统改写也失败: {e2}")
                 return text
         
         # 使用传统方法
-        if self.natural_rewriter:
+        if self._rewrite_fn:
             try:
-                if hasattr(self.natural_rewriter, 'rewrite_naturally'):
-                    return self.natural_rewriter.rewrite_naturally(text, style)
-                elif hasattr(self.natural_rewriter, 'rewrite'):
-                    return self.natural_rewriter.rewrite(text, style=style)
+                return self._natural_rewrite(text, style)
             except Exception as e:
                 print(f"⚠️  传统改写失败: {e}")
         
@@ -266,6 +409,20 @@ class UnifiedRewriter:
         Returns:
             分析结果字典
         """
+        # 内容过短时直接返回空结果
+        if len(content) < self.MIN_ANALYZE_CHARS:
+            return {
+                'characters': {},
+                'storyline': {},
+                'plot': {}
+            }
+        
+        key = _content_key(content) if self.use_cache else None
+        if key is not None:
+            cached = self._cache_get(self._analyze_cache, key)
+            if cached is not None:
+                return dict(cached)
+        
         result = {
             'characters': {},
             'storyline': {},
@@ -274,12 +431,21 @@ class UnifiedRewriter:
         
         if self.ai_analyzer:
             try:
-                result['characters'] = self.ai_analyzer.analyze_characters(content)
-                result['storyline'] = self.ai_analyzer.analyze_storyline(content)
-                result['plot'] = self.ai_analyzer.analyze_plot(content)
+                # 支持一次完成三项分析的分析器（如HuggingFace）并发生成，否则逐项分析
+                if hasattr(self.ai_analyzer, 'analyze_async') and not _in_event_loop():
+                    result.update(asyncio.run(self.ai_analyzer.analyze_async(content)))
+                else:
+                    result['characters'] = self.ai_analyzer.analyze_characters(content)
+                    result['storyline'] = self.ai_analyzer.analyze_storyline(content)
+                    result['plot'] = self.ai_analyzer.analyze_plot(content)
             except Exception as e:
                 print(f"⚠️  AI分析失败: {e}")
+                # 失败的结果不缓存，下次调用重新分析
+                return result
         
+        # 分析器内部失败时返回空结果，全部为空时不缓存，下次调用重新分析
+        if key is not None and any(result.values()):
+            self._cache_put(self._analyze_cache, key, dict(result))
         return result
     
     def generate(self, 
@@ -297,9 +463,12 @@ class UnifiedRewriter:
         Returns:
             生成的内容
         """
+        ContentGenerator = _load_dependency('ContentGenerator')
         if ContentGenerator:
             try:
-                generator = ContentGenerator()
+                if self._content_generator is None:
+                    self._content_generator = ContentGenerator()
+                generator = self._content_generator
                 
                 if generation_type == "expand":
                     # expand_content需要chapter_num参数
@@ -326,7 +495,6 @@ class UnifiedRewriter:
                     
             except Exception as e:
                 print(f"⚠️  内容生成失败: {e}")
-                import traceback
                 traceback.print_exc()
                 return base_content
         else:
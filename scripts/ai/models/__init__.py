@@ -4,10 +4,24 @@
 AI模型模块
 """
 
-from .tensorflow_model import (
-    TensorFlowTextRewriter,
-    TensorFlowAnalyzer
-)
+import importlib
+
+# 导出名称 -> (模块, 属性名)，首次访问时才导入，避免导入子模块时就加载tensorflow
+_LAZY_IMPORTS = {
+    'TensorFlowTextRewriter': ('.tensorflow_model', 'TensorFlowTextRewriter'),
+    'TensorFlowAnalyzer': ('.tensorflow_model', 'TensorFlowAnalyzer'),
+}
+
+
+def __getattr__(name):
+    """按需导入导出的类"""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     'TensorFlowTextRewriter',
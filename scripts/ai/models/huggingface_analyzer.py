@@ -5,23 +5,111 @@ HuggingFace分析器
 集成到AI分析器系统中
 """
 
+import asyncio
 from typing import Dict, Optional
 from .huggingface_model import HuggingFaceTextRewriter
 
 
+# 各项分析的提示词为：公共开头 + 文本 + 各自的分析要求
+# 文本放在前面作为三项分析的公共前缀（可被前缀缓存复用），分析要求放在末尾
+_ANALYSIS_HEAD = "以下是需要分析的文本：\n\n"
+_ANALYSIS_INSTRUCTIONS = {
+    'characters': "\n\n请分析上文中出现的主要人物，提取每个人物的性格特征、外貌特征、说话风格等信息",
+    'storyline': "\n\n请分析上文的故事脉络，提取主要情节、关键事件、故事发展线索",
+    'plot': "\n\n请分析上文的情节结构，提取冲突、转折、高潮等关键情节点",
+}
+
+# 分析文本按token预算截取：上下文最多使用的token数，及其中为提示词开头和分析要求留出的token数
+_MAX_CONTEXT_TOKENS = 1024
+_PROMPT_RESERVE_TOKENS = 128
+
+
 class HuggingFaceAnalyzer:
     """HuggingFace分析器（集成到AI分析器）"""
     
-    def __init__(self, model_path: str, model_type: str = 'auto'):
+    def __init__(self, model_path: str, model_type: str = 'auto',
+                 quantization: Optional[str] = None):
         """
         初始化HuggingFace分析器
         
         Args:
             model_path: 模型路径
             model_type: 模型类型
+            quantization: 量化方式（'int8', 'int4', 'awq', 'gptq'，默认不量化）
         """
-        self.rewriter = HuggingFaceTextRewriter(model_path, model_type)
+        self.rewriter = HuggingFaceTextRewriter(model_path, model_type, quantization=quantization)
         self.model_loaded = True
+        self._last_analysis = None  # (content, 各项分析的模型响应)
+        
+        # 文本部分可用的token数（不超过模型的上下文长度）
+        context_tokens = min(self.rewriter.tokenizer.model_max_length, _MAX_CONTEXT_TOKENS)
+        self._sample_tokens = context_tokens - _PROMPT_RESERVE_TOKENS
+        
+        # 提示词固定部分的token id只编码一次，每次分析只对文本分词一次（transformers标准生成方式）
+        self._head_ids = None
+        self._instruction_ids = None
+        if self.rewriter.supports_token_ids:
+            self._head_ids = self.rewriter.encode(_ANALYSIS_HEAD)
+            self._instruction_ids = [self.rewriter.encode(text) for text in _ANALYSIS_INSTRUCTIONS.values()]
+    
+    def _analyze_all(self, content: str) -> Dict[str, str]:
+        """
+        一次批量生成人物、故事脉络、情节三项分析的模型响应
+        
+        同一内容的三个 analyze_* 调用共用一次生成结果
+        
+        Args:
+            content: 文本内容
+        
+        Returns:
+            分析项 -> 模型响应
+        """
+        if self._last_analysis is not None and self._last_analysis[0] == content:
+            return self._last_analysis[1]
+        
+        # 按token数而非字符数截取文本：只对开头 预算×4 个字符分词（一个token通常不超过4个字符，足以填满预算）
+        # 只截取文本部分，提示词开头和分析要求完整保留
+        sample_ids = self.rewriter.encode(content[:self._sample_tokens * 4])[:self._sample_tokens]
+        sample = self.rewriter.tokenizer.decode(sample_ids)
+        prompts = [_ANALYSIS_HEAD + sample + text for text in _ANALYSIS_INSTRUCTIONS.values()]
+        prompt_ids = None
+        if self._head_ids is not None:
+            prompt_ids = [self._head_ids + sample_ids + ids for ids in self._instruction_ids]
+            # 分段编码后拼接的结果可能与整段编码不同（BPE在拼接处合并、截断处拆开了字符等），
+            # 此时改用文本提示词整段编码；各分析要求开头相同，拼接处的分词也相同，只需核对第一条
+            if not self.rewriter.matches_encoding(prompt_ids[0], prompts[0]):
+                prompt_ids = None
+        
+        if prompt_ids is not None:
+            outputs = self.rewriter.rewrite_batch_ids(prompt_ids, max_new_tokens=1024)
+        else:
+            outputs = self.rewriter.rewrite_batch(prompts, max_new_tokens=1024)
+        responses = dict(zip(_ANALYSIS_INSTRUCTIONS, outputs))
+        self._last_analysis = (content, responses)
+        return responses
+    
+    async def analyze_async(self, content: str) -> Dict[str, Dict]:
+        """
+        同时完成人物、故事脉络、情节三项分析（三个提示词在同一批中生成，生成在线程中进行，不阻塞事件循环）
+        
+        Args:
+            content: 文本内容
+        
+        Returns:
+            {'characters': ..., 'storyline': ..., 'plot': ...}
+        """
+        try:
+            await asyncio.to_thread(self._analyze_all, content)
+        except Exception as e:
+            print(f"⚠️  分析失败: {e}")
+            return {'characters': {}, 'storyline': {}, 'plot': {}}
+        
+        # 模型响应已缓存，以下各项只做解析
+        return {
+            'characters': self.analyze_characters(content),
+            'storyline': self.analyze_storyline(content),
+            'plot': self.analyze_plot(content)
+        }
     
     def analyze_characters(self, content: str) -> Dict[str, Dict]:
         """
@@ -33,10 +121,8 @@ class HuggingFaceAnalyzer:
         Returns:
             人物信息字典
         """
-        prompt = f"请分析以下文本中出现的主要人物，提取每个人物的性格特征、外貌特征、说话风格等信息：\n\n{content[:2000]}"
-        
         try:
-            response = self.rewriter.rewrite(prompt, max_length=1024)
+            response = self._analyze_all(content)['characters']
             # 这里可以解析响应，提取人物信息
             # 暂时返回空字典，需要根据实际模型响应格式进行解析
             return {}
@@ -54,10 +140,8 @@ class HuggingFaceAnalyzer:
         Returns:
             故事脉络信息
         """
-        prompt = f"请分析以下文本的故事脉络，提取主要情节、关键事件、故事发展线索：\n\n{content[:2000]}"
-        
         try:
-            response = self.rewriter.rewrite(prompt, max_length=1024)
+            response = self._analyze_all(content)['storyline']
             return {}
         except Exception as e:
             print(f"⚠️  故事脉络分析失败: {e}")
@@ -73,17 +157,15 @@ class HuggingFaceAnalyzer:
         Returns:
             情节结构信息
         """
-        prompt = f"请分析以下文本的情节结构，提取冲突、转折、高潮等关键情节点：\n\n{content[:2000]}"
-        
         try:
-            response = self.rewriter.rewrite(prompt, max_length=1024)
+            response = self._analyze_all(content)['plot']
             return {}
         except Exception as e:
             print(f"⚠️  情节分析失败: {e}")
             return {}
     
-    def rewrite_text(self, text: str, style: str, 
-                    perspective: Optional[str] = None, 
+    def rewrite_text(self, text: str, style: str,
+                    perspective: Optional[str] = None,
                     context: Optional[str] = None) -> str:
         """
         改写文本
@@ -98,4 +180,3 @@ class HuggingFaceAnalyzer:
             改写后的文本
         """
         return self.rewriter.rewrite(text, style=style, context=context)
-
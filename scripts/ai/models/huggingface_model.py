@@ -5,27 +5,46 @@ HuggingFace模型集成
 将下载的HuggingFace模型集成到项目中，用于文本改写
 """
 
+import asyncio
+import importlib.util
 import os
 import sys
+import uuid
 from typing import Optional, Dict, List
 import torch
 
 
+# torch.compile 时输入统一填充到的长度档位（固定形状，避免每次调用重新编译）
+_COMPILE_BUCKETS = (128, 256, 512, 1024)
+
+
 class HuggingFaceTextRewriter:
     """基于HuggingFace模型的文本改写器"""
     
-    def __init__(self, model_path: str, model_type: str = 'auto'):
+    def __init__(self, model_path: str, model_type: str = 'auto',
+                 quantization: Optional[str] = None):
         """
         初始化HuggingFace文本改写器
         
         Args:
             model_path: 模型路径（本地路径或HuggingFace模型ID）
-            model_type: 模型类型（'auto', 'chatglm', 'qwen', 'baichuan'等）
+            model_type: 模型类型（'auto', 'chatglm', 'qwen', 'baichuan', 'vllm'等）
+            quantization: 量化方式（'int8', 'int4', 'awq', 'gptq'，默认不量化）
         """
+        if quantization not in (None, 'int8', 'int4', 'awq', 'gptq'):
+            raise ValueError(f"不支持的量化方式: {quantization}")
+        
         self.model_path = model_path
         self.model_type = model_type
+        self.quantization = quantization
         self.model = None
         self.tokenizer = None
+        self.engine = None  # vLLM AsyncLLMEngine（model_type='vllm'时使用）
+        self._loop = None
+        self.compiled = False
+        self._eager_forward = None  # 编译前的forward，编译后首次生成成功前保留，失败时恢复
+        self._prompt_prefix_ids = None  # 无风格、上下文时提示词固定开头的token id
+        self._input_buffers = {}  # (输入名, 形状) -> (锁页内存张量, 设备端张量)，固定形状时复用
         self.device = self._get_device()
         
         # 加载模型
@@ -49,7 +68,9 @@ class HuggingFaceTextRewriter:
             print(f"   设备: {self.device}")
             
             # 根据模型类型选择加载方式
-            if 'chatglm' in self.model_path.lower() or 'chatglm' in self.model_type.lower():
+            if self.model_type.lower() == 'vllm':
+                self._load_vllm()
+            elif 'chatglm' in self.model_path.lower() or 'chatglm' in self.model_type.lower():
                 self._load_chatglm()
             elif 'qwen' in self.model_path.lower() or 'qwen' in self.model_type.lower():
                 self._load_qwen()
@@ -59,6 +80,9 @@ class HuggingFaceTextRewriter:
                 # 自动检测
                 self._load_auto()
             
+            if self.model is not None:
+                self._compile_model()
+            
             print("✅ 模型加载完成")
             
         except ImportError:
@@ -69,6 +93,151 @@ class HuggingFaceTextRewriter:
             print(f"❌ 模型加载失败: {e}")
             raise
     
+    @staticmethod
+    def _cpu_dtype() -> torch.dtype:
+        """CPU推理使用的精度（CPU支持AVX-512 BF16时用bfloat16，权重读写量减半）"""
+        is_bf16_supported = getattr(torch.cpu, '_is_avx512_bf16_supported', None)
+        if is_bf16_supported is not None and is_bf16_supported():
+            return torch.bfloat16
+        return torch.float32
+    
+    def _compile_model(self):
+        """
+        用 torch.compile 编译前向计算（设置 GETBOOK_COMPILE=1 时开启，需要 PyTorch 2.1+）
+        
+        只编译CUDA上未量化、支持静态KV缓存的模型：默认的KV缓存每步变长，每步解码都会重新编译
+        """
+        if os.environ.get('GETBOOK_COMPILE', '0') != '1' or not hasattr(torch, 'compile'):
+            return
+        if tuple(int(part) for part in torch.__version__.split('.')[:2]) < (2, 1):
+            return
+        
+        generation_config = getattr(self.model, 'generation_config', None)
+        if (self.device != 'cuda' or self.quantization is not None
+                or getattr(self.model, 'is_quantized', False) or generation_config is None
+                or not getattr(self.model, '_supports_static_cache', False)):
+            print("⚠️  当前设备或模型不支持编译（需CUDA、未量化且支持静态KV缓存），使用普通模式")
+            return
+        
+        eager_forward = self.model.forward
+        try:
+            # 只编译forward，generate/chat 等方法保持原样可用
+            self.model.forward = torch.compile(
+                eager_forward,
+                mode='reduce-overhead',
+                fullgraph=False,
+                dynamic=False
+            )
+        except Exception as e:
+            print(f"⚠️  torch.compile 失败，使用普通模式: {e}")
+            return
+        
+        # reduce-overhead 模式在CUDA上用CUDA Graph重放每步解码；静态KV缓存使各步形状固定，
+        # 录制的计算图才能在整个解码循环中复用
+        generation_config.cache_implementation = 'static'
+        self.compiled = True
+        self._eager_forward = eager_forward
+    
+    def _disable_compile(self):
+        """恢复未编译的forward和默认KV缓存（编译后的模型首次生成失败时调用）"""
+        self.model.forward = self._eager_forward
+        self.model.generation_config.cache_implementation = None
+        self.compiled = False
+        self._eager_forward = None
+        self._input_buffers.clear()
+    
+    def _load_vllm(self):
+        """通过vLLM加载模型（PagedAttention + 连续批处理，适合多请求场景）"""
+        try:
+            from vllm import AsyncEngineArgs, AsyncLLMEngine
+        except ImportError:
+            print("❌ 需要安装 vllm")
+            print("   运行: pip install vllm")
+            raise
+        
+        from transformers import AutoTokenizer
+        
+        # 引擎内部自带分词器，这里另外加载一份供截取、统计token数使用
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            self.model_path,
+            trust_remote_code=True
+        )
+        self.engine = AsyncLLMEngine.from_engine_args(AsyncEngineArgs(
+            model=self.model_path,
+            trust_remote_code=True,
+            enable_prefix_caching=True  # 相同前缀的提示词只预填充一次
+        ))
+        # 引擎的后台任务绑定在事件循环上，同步调用时始终复用同一个循环
+        self._loop = asyncio.new_event_loop()
+    
+    def _weights_kwargs(self) -> Dict:
+        """
+        构建加载权重的 from_pretrained 参数
+        
+        权重逐个分片直接放到目标设备，不在内存中先完整构建一份；本地模型目录有safetensors权重时通过mmap读取
+        
+        Returns:
+            需要合并到 from_pretrained 的参数
+        """
+        kwargs = {'low_cpu_mem_usage': True}
+        if os.path.isdir(self.model_path) and any(
+            name.endswith('.safetensors') for name in os.listdir(self.model_path)
+        ):
+            kwargs['use_safetensors'] = True
+        return kwargs
+    
+    def _quantization_kwargs(self) -> Dict:
+        """
+        构建加载时量化所需的 from_pretrained 参数
+        
+        Returns:
+            需要合并到 from_pretrained 的参数（不量化时为空字典）
+        """
+        # AWQ/GPTQ 模型的量化配置保存在检查点中，直接加载即可
+        if self.quantization not in ('int8', 'int4'):
+            return {}
+        
+        from transformers import BitsAndBytesConfig
+        
+        if self.quantization == 'int8':
+            quant_config = BitsAndBytesConfig(load_in_8bit=True)
+        else:
+            quant_config = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_quant_type='nf4',
+                bnb_4bit_compute_dtype=torch.float16
+            )
+        return {'quantization_config': quant_config}
+    
+    def _causal_lm_from_pretrained(self):
+        """
+        用 AutoModelForCausalLM 加载模型（CUDA且安装了flash_attn时尽量使用FlashAttention-2）
+        
+        Returns:
+            加载的模型
+        """
+        from transformers import AutoModelForCausalLM
+        
+        kwargs = dict(
+            trust_remote_code=True,
+            device_map='auto' if self.device != 'cpu' else None,
+            torch_dtype=torch.float16 if self.device != 'cpu' else self._cpu_dtype(),
+            **self._weights_kwargs(),
+            **self._quantization_kwargs()
+        )
+        
+        # 其余情况不显式指定，由transformers在模型支持时自动使用sdpa
+        if self.device == 'cuda' and importlib.util.find_spec('flash_attn') is not None:
+            try:
+                return AutoModelForCausalLM.from_pretrained(
+                    self.model_path, attn_implementation='flash_attention_2', **kwargs
+                )
+            except (ValueError, ImportError) as e:
+                # Qwen-7B-Chat、Baichuan 等remote code模型未声明支持FlashAttention-2，指定时会报错
+                print(f"⚠️  模型不支持FlashAttention-2，使用默认注意力实现: {e}")
+        
+        return AutoModelForCausalLM.from_pretrained(self.model_path, **kwargs)
+    
     def _load_chatglm(self):
         """加载ChatGLM模型"""
         from transformers import AutoTokenizer, AutoModel
@@ -80,63 +249,52 @@ class HuggingFaceTextRewriter:
         self.model = AutoModel.from_pretrained(
             self.model_path,
             trust_remote_code=True,
-            device_map='auto' if self.device != 'cpu' else None
+            device_map='auto' if self.device != 'cpu' else None,
+            **self._weights_kwargs(),
+            **self._quantization_kwargs()
         )
         
-        if self.device == 'cpu':
-            self.model = self.model.float()
-        else:
-            self.model = self.model.half()
+        # 量化模型加载时已确定权重格式，不再转换精度
+        if self.quantization is None:
+            if self.device == 'cpu':
+                self.model = self.model.to(self._cpu_dtype())
+            else:
+                self.model = self.model.half()
         
         self.model.eval()
     
     def _load_qwen(self):
         """加载Qwen模型"""
-        from transformers import AutoTokenizer, AutoModelForCausalLM
+        from transformers import AutoTokenizer
         
         self.tokenizer = AutoTokenizer.from_pretrained(
             self.model_path,
             trust_remote_code=True
         )
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.model_path,
-            trust_remote_code=True,
-            device_map='auto' if self.device != 'cpu' else None,
-            torch_dtype=torch.float16 if self.device != 'cpu' else torch.float32
-        )
+        self.model = self._causal_lm_from_pretrained()
         self.model.eval()
     
     def _load_baichuan(self):
         """加载Baichuan模型"""
-        from transformers import AutoTokenizer, AutoModelForCausalLM
+        from transformers import AutoTokenizer
         
         self.tokenizer = AutoTokenizer.from_pretrained(
             self.model_path,
             trust_remote_code=True
         )
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.model_path,
-            trust_remote_code=True,
-            device_map='auto' if self.device != 'cpu' else None,
-            torch_dtype=torch.float16 if self.device != 'cpu' else torch.float32
-        )
+        self.model = self._causal_lm_from_pretrained()
         self.model.eval()
     
     def _load_auto(self):
         """自动加载模型"""
-        from transformers import AutoTokenizer, AutoModelForCausalLM
+        from transformers import AutoTokenizer
         
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(
                 self.model_path,
                 trust_remote_code=True
             )
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_path,
-                trust_remote_code=True,
-                device_map='auto' if self.device != 'cpu' else None,
-                torch_dtype=torch.float16 if self.device != 'cpu' else torch.float32
-            )
+            self.model = self._causal_lm_from_pretrained()
             self.model.eval()
         except:
             # 尝试加载为AutoModel
@@ -144,16 +302,19 @@ class HuggingFaceTextRewriter:
             self.model = AutoModel.from_pretrained(
                 self.model_path,
                 trust_remote_code=True,
-                device_map='auto' if self.device != 'cpu' else None
+                device_map='auto' if self.device != 'cpu' else None,
+                **self._weights_kwargs(),
+                **self._quantization_kwargs()
             )
-            if self.device == 'cpu':
-                self.model = self.model.float()
-            else:
-                self.model = self.model.half()
+            if self.quantization is None:
+                if self.device == 'cpu':
+                    self.model = self.model.to(self._cpu_dtype())
+                else:
+                    self.model = self.model.half()
             self.model.eval()
     
     def rewrite(self, text: str, style: Optional[str] = None, 
-                context: Optional[str] = None, max_length: int = 512) -> str:
+                context: Optional[str] = None, max_new_tokens: int = 512) -> str:
         """
         改写文本
         
@@ -161,7 +322,7 @@ class HuggingFaceTextRewriter:
             text: 原始文本
             style: 风格（可选）
             context: 上下文（可选）
-            max_length: 最大长度
+            max_new_tokens: 最多生成的token数（不含提示词）
         
         Returns:
             改写后的文本
@@ -170,10 +331,109 @@ class HuggingFaceTextRewriter:
         prompt = self._build_prompt(text, style, context)
         
         # 根据模型类型选择生成方式
-        if 'chatglm' in self.model_type.lower() or hasattr(self.model, 'chat'):
-            return self._generate_chatglm(prompt, max_length)
+        if self.engine is not None:
+            return self._run_vllm([prompt], max_new_tokens)[0]
+        elif self._uses_chat():
+            return self._generate_chatglm(prompt, max_new_tokens)
         else:
-            return self._generate_standard(prompt, max_length)
+            return self._generate_standard(prompt, max_new_tokens)
+    
+    def rewrite_batch(self, texts: List[str], style: Optional[str] = None,
+                      context: Optional[str] = None, max_new_tokens: int = 512,
+                      batch_size: int = 8) -> List[str]:
+        """
+        批量改写文本（多个提示词填充后一次调用 model.generate）
+        
+        Args:
+            texts: 原始文本列表
+            style: 风格（可选）
+            context: 上下文（可选）
+            max_new_tokens: 最多生成的token数（不含提示词）
+            batch_size: 每次生成的提示词数量
+        
+        Returns:
+            与texts一一对应的改写结果列表
+        """
+        prompts = [self._build_prompt(text, style, context) for text in texts]
+        
+        # vLLM自行做连续批处理，一次提交全部提示词
+        if self.engine is not None:
+            return self._run_vllm(prompts, max_new_tokens)
+        
+        # ChatGLM的chat接口不支持批量，逐条生成
+        if self._uses_chat():
+            return [self._generate_chatglm(prompt, max_new_tokens) for prompt in prompts]
+        
+        results = []
+        for start in range(0, len(prompts), batch_size):
+            results.extend(self._generate_standard_batch(prompts[start:start + batch_size], max_new_tokens))
+        return results
+    
+    @property
+    def supports_token_ids(self) -> bool:
+        """是否可以用 rewrite_batch_ids 直接按token id改写（transformers标准生成方式）"""
+        return self.engine is None and not self._uses_chat()
+    
+    def encode(self, text: str) -> List[int]:
+        """
+        编码文本（不加特殊token，可与其他片段的编码直接拼接）
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            token id列表
+        """
+        return self.tokenizer.encode(text, add_special_tokens=False)
+    
+    def rewrite_batch_ids(self, text_ids: List[List[int]], max_new_tokens: int = 512,
+                          batch_size: int = 8) -> List[str]:
+        """
+        批量改写已编码的文本（同 rewrite_batch，但跳过分词，不支持风格和上下文；需 supports_token_ids 为真）
+        
+        Args:
+            text_ids: 各文本的token id列表（由 encode 得到）
+            max_new_tokens: 最多生成的token数（不含提示词）
+            batch_size: 每次生成的提示词数量
+        
+        Returns:
+            与text_ids一一对应的改写结果列表
+        """
+        self._prepare_padding()
+        prefix_ids = self._get_prompt_prefix_ids()
+        prompt_ids = [self.tokenizer.build_inputs_with_special_tokens(prefix_ids + ids) for ids in text_ids]
+        
+        results = []
+        for start in range(0, len(prompt_ids), batch_size):
+            inputs = self.tokenizer.pad({'input_ids': prompt_ids[start:start + batch_size]},
+                                        padding=True, return_tensors="pt")
+            results.extend(self._generate_padded(inputs, max_new_tokens))
+        return results
+    
+    def matches_encoding(self, text_ids: List[int], text: str) -> bool:
+        """
+        核对 rewrite_batch_ids 拼接出的提示词与对整段提示词编码的结果是否一致
+        
+        分段编码后拼接时，BPE可能在拼接处合并出不同的token，此时应改用整段编码的结果
+        
+        Args:
+            text_ids: 分段编码后拼接的token id列表
+            text: 对应的文本
+        
+        Returns:
+            是否一致
+        """
+        return self._get_prompt_prefix_ids() + text_ids == self.encode(self._build_prompt(text))
+    
+    def _get_prompt_prefix_ids(self) -> List[int]:
+        """提示词固定开头的token id（只编码一次）"""
+        if self._prompt_prefix_ids is None:
+            self._prompt_prefix_ids = self.encode(self._build_prompt(''))
+        return self._prompt_prefix_ids
+    
+    def _uses_chat(self) -> bool:
+        """是否使用ChatGLM的chat接口生成"""
+        return 'chatglm' in self.model_type.lower() or hasattr(self.model, 'chat')
     
     def _build_prompt(self, text: str, style: Optional[str] = None, 
                      context: Optional[str] = None) -> str:
@@ -191,44 +451,154 @@ class HuggingFaceTextRewriter:
         
         return "\n".join(prompt_parts)
     
-    def _generate_chatglm(self, prompt: str, max_length: int) -> str:
+    def _generate_chatglm(self, prompt: str, max_new_tokens: int) -> str:
         """使用ChatGLM生成"""
         if hasattr(self.model, 'chat'):
-            response, _ = self.model.chat(
-                self.tokenizer,
-                prompt,
-                history=[],
-                max_length=max_length,
-                temperature=0.7
-            )
+            with torch.inference_mode():
+                response, _ = self.model.chat(
+                    self.tokenizer,
+                    prompt,
+                    history=[],
+                    max_new_tokens=max_new_tokens,
+                    temperature=0.7
+                )
             return response
         else:
-            return self._generate_standard(prompt, max_length)
+            return self._generate_standard(prompt, max_new_tokens)
     
-    def _generate_standard(self, prompt: str, max_length: int) -> str:
+    def _generate_standard(self, prompt: str, max_new_tokens: int) -> str:
         """标准生成方式"""
-        inputs = self.tokenizer(prompt, return_tensors="pt", padding=True, truncation=True)
+        return self._generate_standard_batch([prompt], max_new_tokens)[0]
+    
+    def _generate_standard_batch(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        """
+        标准生成方式（批量）
+        
+        Args:
+            prompts: 提示词列表
+            max_new_tokens: 最多生成的token数（不含提示词）
+        
+        Returns:
+            与prompts一一对应的生成文本
+        """
+        self._prepare_padding()
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True)
+        return self._generate_padded(inputs, max_new_tokens)
+    
+    def _prepare_padding(self):
+        """仅解码器模型需要左侧填充，生成的内容才能紧接在各自的提示词之后"""
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = 'left'
+    
+    def _generate_padded(self, inputs, max_new_tokens: int) -> List[str]:
+        """
+        对已左侧填充的一批输入调用 model.generate
+        
+        Args:
+            inputs: 含 input_ids、attention_mask 的分词结果
+            max_new_tokens: 最多生成的token数（不含提示词）
+        
+        Returns:
+            每条输入生成的文本
+        """
+        # 编译后的模型按固定档位填充输入，复用已编译的计算图
+        if self.compiled:
+            length = inputs['input_ids'].shape[1]
+            bucket = next((size for size in _COMPILE_BUCKETS if size >= length), length)
+            pad = bucket - length
+            if pad:
+                inputs['input_ids'] = torch.nn.functional.pad(
+                    inputs['input_ids'], (pad, 0), value=self.tokenizer.pad_token_id
+                )
+                inputs['attention_mask'] = torch.nn.functional.pad(
+                    inputs['attention_mask'], (pad, 0), value=0
+                )
         
         if self.device != 'cpu':
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_length=max_length,
-                temperature=0.7,
-                top_p=0.9,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id
-            )
+            inputs = self._to_device(inputs)
         
-        generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        generate_kwargs = dict(
+            max_new_tokens=max_new_tokens,
+            use_cache=True,
+            temperature=0.7,
+            top_p=0.9,
+            do_sample=True,
+            pad_token_id=self.tokenizer.pad_token_id
+        )
+        with torch.inference_mode():
+            try:
+                outputs = self.model.generate(**inputs, **generate_kwargs)
+            except Exception as e:
+                # torch.compile 在首次调用时才真正编译，编译失败时退回普通模式重新生成
+                if self._eager_forward is None:
+                    raise
+                print(f"⚠️  torch.compile 失败，使用普通模式: {e}")
+                self._disable_compile()
+                outputs = self.model.generate(**inputs, **generate_kwargs)
+        self._eager_forward = None
         
-        # 提取生成的部分（去除提示词）
-        if prompt in generated_text:
-            generated_text = generated_text.replace(prompt, "").strip()
+        # 左侧填充后所有提示词都占据前 prompt_len 个位置，只解码之后生成的部分
+        prompt_len = inputs['input_ids'].shape[1]
+        return [text.strip() for text in self.tokenizer.batch_decode(outputs[:, prompt_len:], skip_special_tokens=True)]
+    
+    def _to_device(self, inputs) -> Dict:
+        """
+        把分词结果复制到模型所在设备
+        
+        CUDA上经锁页内存异步复制；编译模式下输入形状只有少数几档，复用已分配的锁页内存和设备端张量
+        
+        Args:
+            inputs: 分词器输出
+        
+        Returns:
+            输入名 -> 设备上的张量
+        """
+        if self.device != 'cuda':
+            return {name: tensor.to(self.device) for name, tensor in inputs.items()}
+        
+        device_inputs = {}
+        for name, tensor in inputs.items():
+            if not self.compiled:
+                device_inputs[name] = tensor.pin_memory().to(self.device, non_blocking=True)
+                continue
+            key = (name, tuple(tensor.shape))
+            buffers = self._input_buffers.get(key)
+            if buffers is None:
+                buffers = (torch.empty_like(tensor).pin_memory(), torch.empty_like(tensor, device=self.device))
+                self._input_buffers[key] = buffers
+            host_buffer, device_buffer = buffers
+            host_buffer.copy_(tensor)
+            device_buffer.copy_(host_buffer, non_blocking=True)
+            device_inputs[name] = device_buffer
+        return device_inputs
+    
+    async def _generate_vllm(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        """
+        vLLM生成方式（所有提示词同时提交给引擎）
+        
+        Args:
+            prompts: 提示词列表
+            max_new_tokens: 最多生成的token数（不含提示词）
         
-        return generated_text
+        Returns:
+            与prompts一一对应的生成文本
+        """
+        from vllm import SamplingParams
+        
+        sampling_params = SamplingParams(temperature=0.7, top_p=0.9, max_tokens=max_new_tokens)
+        
+        async def generate_one(prompt: str) -> str:
+            final_output = None
+            async for request_output in self.engine.generate(prompt, sampling_params, uuid.uuid4().hex):
+                final_output = request_output
+            return final_output.outputs[0].text.strip()
+        
+        return list(await asyncio.gather(*(generate_one(prompt) for prompt in prompts)))
+    
+    def _run_vllm(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        """_generate_vllm 的同步封装"""
+        return self._loop.run_until_complete(self._generate_vllm(prompts, max_new_tokens))
     
     def analyze(self, text: str) -> Dict:
         """分析文本"""
@@ -244,10 +614,11 @@ def main():
     parser.add_argument('--model-path', required=True, help='模型路径')
     parser.add_argument('--text', help='要改写的文本')
     parser.add_argument('--style', help='风格')
+    parser.add_argument('--quantization', choices=['int8', 'int4', 'awq', 'gptq'], help='量化方式')
     
     args = parser.parse_args()
     
-    rewriter = HuggingFaceTextRewriter(args.model_path)
+    rewriter = HuggingFaceTextRewriter(args.model_path, quantization=args.quantization)
     
     if args.text:
         result = rewriter.rewrite(args.text, style=args.style)
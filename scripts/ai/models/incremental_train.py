@@ -9,25 +9,54 @@ import os
 import sys
 import json
 import argparse
+import shutil
+import numpy as np
 from typing import List, Tuple
+import tensorflow as tf
 
 sys.path.insert(0, os.path.dirname(__file__))
 from tensorflow_model import TensorFlowTextRewriter
 from train_model import prepare_training_data
 
+# Linux 上 FICLONE ioctl 的请求号（在 Btrfs/XFS 等文件系统上共享数据块，写时复制）
+_FICLONE = 0x40049409
+
+# 每次调用编译后的训练函数执行的步数（小批次训练时分摊Python到TF的调度开销）
+_STEPS_PER_EXECUTION = 32
+
+
+def _fast_copy(src: str, dst: str):
+    """
+    复制模型文件：文件系统支持时只克隆数据块引用（不读写数据），否则普通复制
+    
+    不使用硬链接：之后的训练会原地覆盖源文件，硬链接会让目标文件一起改变
+    
+    Args:
+        src: 源文件
+        dst: 目标文件
+    """
+    try:
+        import fcntl
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copymode(src, dst)
+    except (ImportError, OSError):
+        shutil.copy(src, dst)
+
 
 class IncrementalTrainer:
     """增量训练器"""
     
-    def __init__(self, model_path: str = "models/text_rewriter_model"):
+    def __init__(self, model_path: str = "models/text_rewriter_model", mixed_precision: bool = True):
         """
         初始化增量训练器
         
         Args:
             model_path: 模型路径
+            mixed_precision: 有GPU时是否使用混合精度（float16计算、float32权重）训练
         """
         self.model_path = model_path
-        self.rewriter = TensorFlowTextRewriter(model_path=model_path)
+        self.rewriter = TensorFlowTextRewriter(model_path=model_path, mixed_precision=mixed_precision)
     
     def load_existing_model(self) -> bool:
         """加载已有模型"""
@@ -59,14 +88,15 @@ class IncrementalTrainer:
         """
         print(f"\n📚 合并词汇表...")
         
-        # 收集新词汇
-        new_chars = set()
-        for text in new_texts:
-            new_chars.update(text)
+        # 收集新词汇（在码位数组上去重并与已有词汇求差集，只把少量新字符转换回字符串）
+        codepoints = np.unique(np.frombuffer(''.join(new_texts).encode('utf-32-le'), dtype=np.uint32))
+        existing_codepoints = np.fromiter(
+            (ord(char) for char in self.rewriter.vocab if len(char) == 1), dtype=np.uint32
+        )
+        existing_size = len(self.rewriter.vocab)
         
         # 检查是否有新字符
-        existing_chars = set(self.rewriter.vocab.keys())
-        new_chars = new_chars - existing_chars
+        new_chars = [chr(code) for code in np.setdiff1d(codepoints, existing_codepoints).tolist()]
         
         if not new_chars:
             print("✅ 没有新词汇需要添加")
@@ -85,32 +115,76 @@ class IncrementalTrainer:
         
         self.rewriter.vocab_size = current_size
         
-        print(f"   词汇表已更新: {len(existing_chars)} → {current_size}")
+        print(f"   词汇表已更新: {existing_size} → {current_size}")
         
         # 需要重新构建模型（因为词汇表大小变化）
         print("   重新构建模型以适应新词汇表...")
+        old_model = self.rewriter.model
         self.rewriter.build_model()
         
-        # 加载之前的权重（如果可能）
-        try:
-            old_weights_file = os.path.join(self.model_path, 'best_model.h5')
-            if os.path.exists(old_weights_file):
-                # 尝试加载兼容的权重
-                print("   尝试加载之前的模型权重...")
-                # 注意：如果词汇表大小变化，可能需要特殊处理
-                try:
-                    # 尝试加载权重（如果结构兼容）
-                    self.rewriter.model.load_weights(old_weights_file, by_name=True, skip_mismatch=True)
-                    print("   ✅ 成功加载部分权重")
-                except Exception as e:
-                    print(f"   ⚠️  无法加载之前的权重: {e}")
-                    print("   将从头训练")
-        except Exception as e:
-            print(f"   ⚠️  无法加载之前的权重: {e}")
-            print("   将从头训练")
+        # 直接从内存中的旧模型迁移权重（与词汇表相关的权重只扩展新增字符对应的部分）
+        if old_model is not None:
+            try:
+                self._transfer_weights(old_model, self.rewriter.model)
+                print("   ✅ 已迁移之前的模型权重")
+            except Exception as e:
+                print(f"   ⚠️  无法加载之前的权重: {e}")
+                print("   将从头训练")
         
         return True
     
+    @staticmethod
+    def _transfer_weights(old_model, new_model):
+        """
+        把旧模型的权重按层名复制到新模型
+        
+        词汇表扩大后，嵌入矩阵和输出层的形状会在词汇维度上变大：
+        已有字符的权重原样保留，新增字符的部分随机初始化（偏置初始化为0）
+        
+        Args:
+            old_model: 旧模型
+            new_model: 按新词汇表构建的模型
+        """
+        old_layers = {layer.name: layer.get_weights() for layer in old_model.layers}
+        for layer in new_model.layers:
+            old_weights = old_layers.get(layer.name)
+            if not old_weights:
+                continue
+            
+            new_weights = []
+            for old, current in zip(old_weights, layer.get_weights()):
+                if old.shape == current.shape:
+                    new_weights.append(old)
+                    continue
+                if old.ndim != current.ndim or any(o > n for o, n in zip(old.shape, current.shape)):
+                    raise ValueError(f"层 {layer.name} 的权重形状不兼容: {old.shape} → {current.shape}")
+                
+                if current.ndim == 1:
+                    resized = np.zeros(current.shape, dtype=old.dtype)
+                else:
+                    resized = np.random.normal(scale=0.01, size=current.shape).astype(old.dtype)
+                resized[tuple(slice(0, dim) for dim in old.shape)] = old
+                new_weights.append(resized)
+            
+            layer.set_weights(new_weights)
+    
+    def _compile(self, optimizer_class, learning_rate: float, jit_compile: bool):
+        """
+        以指定学习率重新编译模型
+        
+        Args:
+            optimizer_class: 优化器类
+            learning_rate: 学习率
+            jit_compile: 是否使用XLA编译训练步骤（融合嵌入、全连接和softmax等操作）
+        """
+        self.rewriter.model.compile(
+            optimizer=optimizer_class(learning_rate=learning_rate),
+            loss=tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True),
+            metrics=['accuracy'],
+            steps_per_execution=_STEPS_PER_EXECUTION,
+            jit_compile=jit_compile
+        )
+    
     def incremental_train(self, new_data_file: str, 
                          epochs: int = 10,
                          batch_size: int = 16,
@@ -152,23 +226,40 @@ class IncrementalTrainer:
             original_texts, rewritten_texts, styles
         )
         
-        # 调整学习率
-        self.rewriter.model.compile(
-            optimizer=self.rewriter.model.optimizer.__class__(learning_rate=learning_rate),
-            loss='sparse_categorical_crossentropy',
-            metrics=['accuracy']
+        # 调整学习率（使用XLA编译训练步骤）
+        # 混合精度下优化器被 LossScaleOptimizer 包装，取其内部优化器的类
+        optimizer = self.rewriter.model.optimizer
+        optimizer_class = getattr(optimizer, 'inner_optimizer', optimizer).__class__
+        self._compile(optimizer_class, learning_rate, jit_compile=True)
+        
+        # 构建输入管道（与 validation_split=0.2 相同，取末尾20%作为验证集）
+        num_train = len(y) - int(len(y) * 0.2)
+        train_ds = self.rewriter.make_dataset(
+            X_text[:num_train], X_style[:num_train], y[:num_train], batch_size, shuffle=True
         )
+        val_ds = None
+        if num_train < len(y):
+            val_ds = self.rewriter.make_dataset(X_text[num_train:], X_style[num_train:], y[num_train:], batch_size)
         
         # 增量训练
         print(f"\n🎯 开始训练（增量模式）...")
-        history = self.rewriter.model.fit(
-            [X_text, X_style],
-            y,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_split=0.2,
-            verbose=1
-        )
+        try:
+            history = self.rewriter.model.fit(
+                train_ds,
+                epochs=epochs,
+                validation_data=val_ds,
+                verbose=1
+            )
+        except (tf.errors.InvalidArgumentError, tf.errors.UnimplementedError, tf.errors.NotFoundError) as e:
+            # XLA不支持模型中的某些操作时在第一个训练步骤编译时报错，此时回退到普通模式重新训练
+            print(f"⚠️  XLA编译失败，使用普通模式训练: {e}")
+            self._compile(optimizer_class, learning_rate, jit_compile=False)
+            history = self.rewriter.model.fit(
+                train_ds,
+                epochs=epochs,
+                validation_data=val_ds,
+                verbose=1
+            )
         
         # 保存模型
         self.rewriter.model.save(os.path.join(self.model_path, 'incremental_model.h5'))
@@ -196,10 +287,10 @@ class IncrementalTrainer:
                 print("📊 比较模型性能...")
                 # 这里可以添加模型评估逻辑
                 # 暂时直接使用增量模型
-                shutil.copy(incremental_file, final_file)
+                _fast_copy(incremental_file, final_file)
                 print("✅ 已更新最终模型")
             else:
-                shutil.copy(incremental_file, final_file)
+                _fast_copy(incremental_file, final_file)
                 print("✅ 已更新最终模型")
 
 
@@ -230,11 +321,13 @@ def main():
                        help='学习率（默认: 0.0001，增量训练使用较小学习率）')
     parser.add_argument('--merge', action='store_true',
                        help='训练后合并模型')
+    parser.add_argument('--no-mixed-precision', action='store_true',
+                       help='禁用混合精度训练（默认在有GPU时启用）')
     
     args = parser.parse_args()
     
     # 创建增量训练器
-    trainer = IncrementalTrainer(args.model_path)
+    trainer = IncrementalTrainer(args.model_path, mixed_precision=not args.no_mixed_precision)
     
     # 加载已有模型
     if not trainer.load_existing_model():
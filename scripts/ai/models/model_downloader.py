@@ -8,9 +8,17 @@
 import os
 import sys
 import json
+import importlib.util
 from typing import Optional, Dict, List
 from pathlib import Path
 
+# 安装了 hf_transfer 时启用其多连接下载（需在导入 huggingface_hub 之前设置；未安装时启用会导致下载报错）
+if importlib.util.find_spec('hf_transfer') is not None:
+    os.environ.setdefault('HF_HUB_ENABLE_HF_TRANSFER', '1')
+
+# 并行下载的文件数（大模型通常拆分为多个权重分片）
+_DOWNLOAD_WORKERS = 8
+
 
 class ModelDownloader:
     """模型下载器 - 支持从多个平台下载模型"""
@@ -76,6 +84,13 @@ class ModelDownloader:
         """
         self.models_dir = models_dir
         os.makedirs(self.models_dir, exist_ok=True)
+        
+        # 预先建立 使用场景 -> [(模型键名, 最低内存GB)] 的索引，推荐时不再遍历并解析所有模型信息
+        self._models_by_use_case = {}
+        for key, info in self.RECOMMENDED_MODELS.items():
+            min_memory = int(info.get('min_memory', '16GB').replace('GB', ''))
+            for use_case in info.get('suitable_for', []):
+                self._models_by_use_case.setdefault(use_case, []).append((key, min_memory))
     
     def list_available_models(self) -> Dict:
         """列出可用的模型"""
@@ -98,6 +113,7 @@ class ModelDownloader:
         except ImportError:
             print("❌ 需要安装 transformers 和 huggingface_hub")
             print("   运行: pip install transformers huggingface_hub")
+            print("   （可选）安装 hf_transfer 以加速下载: pip install hf_transfer")
             return False
         
         if local_dir is None:
@@ -114,7 +130,8 @@ class ModelDownloader:
             snapshot_download(
                 repo_id=model_name,
                 local_dir=local_dir,
-                local_dir_use_symlinks=False
+                local_dir_use_symlinks=False,
+                max_workers=_DOWNLOAD_WORKERS
             )
             
             print(f"\n✅ 模型下载完成: {local_dir}")
@@ -167,21 +184,11 @@ class ModelDownloader:
         Returns:
             推荐的模型列表
         """
-        recommendations = []
-        
-        for key, info in self.RECOMMENDED_MODELS.items():
-            # 检查是否适合使用场景
-            if use_case in info.get('suitable_for', []):
-                # 检查内存限制
-                if memory_limit:
-                    min_memory_str = info.get('min_memory', '16GB')
-                    min_memory = int(min_memory_str.replace('GB', ''))
-                    if memory_limit >= min_memory:
-                        recommendations.append(key)
-                else:
-                    recommendations.append(key)
-        
-        return recommendations
+        # 取出适合该使用场景的模型，并检查内存限制
+        return [
+            key for key, min_memory in self._models_by_use_case.get(use_case, [])
+            if not memory_limit or memory_limit >= min_memory
+        ]
 
 
 def main():
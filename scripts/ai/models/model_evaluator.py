@@ -8,8 +8,10 @@
 import os
 import json
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable, Iterator
 from collections import Counter
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from .tensorflow_model import TensorFlowTextRewriter
@@ -38,12 +40,13 @@ class ModelEvaluator:
             return True
         return False
     
-    def evaluate_accuracy(self, test_data: List[Tuple[str, str, int]]) -> Dict:
+    def evaluate_accuracy(self, test_data: Iterable[Tuple[str, str, int]], batch_size: int = 256) -> Dict:
         """
         评估模型准确率
         
         Args:
-            test_data: 测试数据列表，每个元素为 (原始文本, 目标文本, 风格ID)
+            test_data: 测试数据（列表或逐条产生样本的迭代器），每个元素为 (原始文本, 目标文本, 风格ID)
+            batch_size: 每次读取并批量改写的样本数
         
         Returns:
             评估结果字典
@@ -52,11 +55,15 @@ class ModelEvaluator:
             if not self.load_model():
                 return {'error': '模型未加载'}
         
+        # 迭代器无法预先知道样本数
+        num_samples = len(test_data) if hasattr(test_data, '__len__') else None
+        
         print(f"\n📊 开始评估模型...")
-        print(f"   测试样本数: {len(test_data)}")
+        if num_samples is not None:
+            print(f"   测试样本数: {num_samples}")
         
         results = {
-            'total': len(test_data),
+            'total': 0,
             'correct': 0,
             'partial_correct': 0,
             'failed': 0,
@@ -64,46 +71,64 @@ class ModelEvaluator:
             'style_accuracy': {},
         }
         
-        length_ratios = []
+        # 长度比例只需要平均值，累加总和与个数即可
+        length_ratio_sum = 0.0
+        length_ratio_count = 0
+        overlaps = []
+        scored_styles = []
         
-        for i, (original, target, style) in enumerate(test_data):
+        # 每次只取出一批样本：批量改写（每个生成步骤对整批只运行一次模型），循环中只做评分
+        for batch in self._iter_batches(test_data, batch_size):
             try:
-                # 使用模型改写
-                rewritten = self.rewriter.rewrite(original, style, temperature=0.7)
-                
-                # 计算长度比例
-                if len(original) > 0:
-                    length_ratio = len(rewritten) / len(original)
-                    length_ratios.append(length_ratio)
-                
-                # 简单的准确率评估（基于字符重叠）
-                overlap = self._calculate_overlap(rewritten, target)
+                rewritten_texts = self.rewriter.rewrite_batch(
+                    [original for original, _, _ in batch],
+                    [style for _, _, style in batch],
+                    temperature=0.7
+                )
+            except Exception as e:
+                # 整批改写失败时只把这一批记为失败，继续评估后面的样本
+                print(f"   ⚠️  评估样本 {results['total'] + 1}-{results['total'] + len(batch)} 时出错: {e}")
+                results['failed'] += len(batch)
+                results['total'] += len(batch)
+                continue
+            
+            for i, ((original, target, style), rewritten) in enumerate(zip(batch, rewritten_texts), results['total']):
+                try:
+                    # 计算长度比例
+                    if len(original) > 0:
+                        length_ratio_sum += len(rewritten) / len(original)
+                        length_ratio_count += 1
+                    
+                    # 简单的准确率评估（基于字符重叠）
+                    overlaps.append(self._calculate_overlap(rewritten, target))
+                    scored_styles.append(style)
+                    
+                    if (i + 1) % 100 == 0:
+                        print(f"   进度: {i+1}/{num_samples}" if num_samples is not None else f"   进度: {i+1}")
                 
-                if overlap > 0.8:
-                    results['correct'] += 1
-                elif overlap > 0.5:
-                    results['partial_correct'] += 1
-                else:
+                except Exception as e:
                     results['failed'] += 1
-                
-                # 按风格统计
-                if style not in results['style_accuracy']:
-                    results['style_accuracy'][style] = {'total': 0, 'correct': 0}
-                results['style_accuracy'][style]['total'] += 1
-                if overlap > 0.8:
-                    results['style_accuracy'][style]['correct'] += 1
-                
-                if (i + 1) % 100 == 0:
-                    print(f"   进度: {i+1}/{len(test_data)}")
+                    if results['failed'] <= 5:
+                        print(f"   ⚠️  评估样本 {i+1} 时出错: {e}")
             
-            except Exception as e:
-                results['failed'] += 1
-                if results['failed'] <= 5:
-                    print(f"   ⚠️  评估样本 {i+1} 时出错: {e}")
+            results['total'] += len(batch)
+        
+        # 统一按重叠度分档计数，并按风格统计
+        overlaps = np.array(overlaps)
+        correct_mask = overlaps > 0.8
+        results['correct'] = int(correct_mask.sum())
+        results['partial_correct'] = int((overlaps > 0.5).sum()) - results['correct']
+        results['failed'] += len(overlaps) - results['correct'] - results['partial_correct']
+        
+        style_ids, style_index = np.unique(np.array(scored_styles, dtype=np.int64), return_inverse=True)
+        style_totals = np.bincount(style_index, minlength=len(style_ids))
+        style_correct = np.bincount(style_index[correct_mask], minlength=len(style_ids))
+        for style, total, correct in zip(style_ids.tolist(), style_totals.tolist(), style_correct.tolist()):
+            results['style_accuracy'][style] = {'total': total, 'correct': correct}
         
         # 计算平均长度比例
-        if length_ratios:
-            results['avg_length_ratio'] = sum(length_ratios) / len(length_ratios)
+        if length_ratio_count:
+            results['avg_length_ratio'] = length_ratio_sum / length_ratio_count
         
         # 计算总体准确率
         results['accuracy'] = results['correct'] / results['total'] if results['total'] > 0 else 0
@@ -116,6 +141,29 @@ class ModelEvaluator:
         
         return results
     
+    @staticmethod
+    def _iter_batches(test_data: Iterable[Tuple[str, str, int]], batch_size: int) -> Iterator[List[Tuple[str, str, int]]]:
+        """
+        按批产生样本，下一批在后台线程中读取（模型运行时释放GIL），与当前批的生成重叠
+        
+        Args:
+            test_data: 测试数据
+            batch_size: 每批样本数
+        
+        Returns:
+            逐批产生样本列表的迭代器
+        """
+        samples = iter(test_data)
+        read_batch = lambda: list(islice(samples, batch_size))
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            next_batch = reader.submit(read_batch)
+            while True:
+                batch = next_batch.result()
+                if not batch:
+                    return
+                next_batch = reader.submit(read_batch)
+                yield batch
+    
     def _calculate_overlap(self, text1: str, text2: str) -> float:
         """
         计算两个文本的重叠度
@@ -174,6 +222,27 @@ class ModelEvaluator:
             print(f"\n📄 报告已保存: {output_file}")
 
 
+def iter_test_data(data_file: str) -> Iterator[Tuple[str, str, int]]:
+    """
+    逐行读取测试数据文件
+    
+    Args:
+        data_file: 测试数据文件（TSV格式：原始文本<TAB>目标文本<TAB>风格ID<TAB>上下文JSON（可选））
+    
+    Returns:
+        逐条产生 (原始文本, 目标文本, 风格ID) 的迭代器
+    """
+    with open(data_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            # 每行最多拆出前三列，不再切分其后的上下文JSON列
+            parts = line.split('\t', 3)
+            if len(parts) >= 3:
+                yield parts[0], parts[1], int(parts[2])
+
+
 def main():
     """主函数"""
     import argparse
@@ -186,20 +255,13 @@ def main():
     
     args = parser.parse_args()
     
-    # 加载测试数据
-    test_data = []
-    with open(args.test_data_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            parts = line.split('\t')
-            if len(parts) >= 3:
-                test_data.append((parts[0], parts[1], int(parts[2])))
-    
-    if not test_data:
+    # 逐行读取测试数据（评估时按批取用，不把整个文件载入内存）
+    test_data = iter_test_data(args.test_data_file)
+    first = next(test_data, None)
+    if first is None:
         print("❌ 没有测试数据")
         return
+    test_data = chain([first], test_data)
     
     # 评估模型
     evaluator = ModelEvaluator(args.model_path)
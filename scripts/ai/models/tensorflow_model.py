@@ -14,11 +14,59 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers, models, optimizers, callbacks
 
+# 序列按实际长度分桶后截短到的宽度（另加 max_length），形状种类少，编译后的训练/推理函数不会频繁重新追踪
+_LENGTH_BUCKETS = (128, 256, 512)
+
+
+class PositionEmbedding(layers.Layer):
+    """可学习的位置编码：按输入序列的实际长度取前若干个位置的嵌入，加到输入上"""
+    
+    def __init__(self, max_length: int, embedding_dim: int, **kwargs):
+        """
+        Args:
+            max_length: 最大序列长度
+            embedding_dim: 嵌入维度
+        """
+        super().__init__(**kwargs)
+        self.max_length = max_length
+        self.embedding_dim = embedding_dim
+        self.supports_masking = True  # 文本嵌入的 <PAD> 掩码原样向后传递
+    
+    def build(self, input_shape):
+        # 权重名和初始化方式与 layers.Embedding 相同
+        self.embeddings = self.add_weight(
+            name='embeddings',
+            shape=(self.max_length, self.embedding_dim),
+            initializer='uniform'
+        )
+        super().build(input_shape)
+    
+    def call(self, inputs):
+        positions = self.embeddings[:tf.shape(inputs)[1]]
+        return inputs + tf.cast(positions, inputs.dtype)
+    
+    def get_config(self):
+        config = super().get_config()
+        config.update({'max_length': self.max_length, 'embedding_dim': self.embedding_dim})
+        return config
+
+
+class RepeatToLength(layers.Layer):
+    """把 (batch_size, features) 沿时间维重复到参考序列的长度（序列长度可变时代替 RepeatVector）"""
+    
+    def call(self, inputs):
+        vector, reference = inputs
+        return tf.repeat(vector[:, tf.newaxis, :], tf.shape(reference)[1], axis=1)
+    
+    def compute_mask(self, inputs, mask=None):
+        return None
+
 
 class TensorFlowTextRewriter:
     """基于TensorFlow的文本改写器"""
     
-    def __init__(self, model_path: Optional[str] = None, vocab_size: int = 10000, embedding_dim: int = 256):
+    def __init__(self, model_path: Optional[str] = None, vocab_size: int = 10000, embedding_dim: int = 256,
+                 mixed_precision: bool = True):
         """
         初始化TensorFlow文本改写器
         
@@ -26,6 +74,7 @@ class TensorFlowTextRewriter:
             model_path: 模型保存路径
             vocab_size: 词汇表大小
             embedding_dim: 词向量维度
+            mixed_precision: 有GPU时是否使用混合精度（float16计算、float32权重）
         """
         self.model_path = model_path or "models/text_rewriter_model"
         self.vocab_size = vocab_size
@@ -35,13 +84,26 @@ class TensorFlowTextRewriter:
         self.vocab = {}
         self.reverse_vocab = {}
         self.max_length = 1024  # 增加最大长度以支持更长的上下文
+        self._char_table = None  # (词汇表对象, 词汇表大小, 码位 -> 字符ID 查找表)
+        self._step_fn = None  # (模型, 为某一位置选出下一个字符的 tf.function)
         
         # 检查是否有GPU
-        self.use_gpu = len(tf.config.list_physical_devices('GPU')) > 0
+        num_gpus = len(tf.config.list_physical_devices('GPU'))
+        self.use_gpu = num_gpus > 0
         if self.use_gpu:
             print("✅ 检测到GPU，将使用GPU加速")
         else:
             print("⚠️  未检测到GPU，将使用CPU（速度较慢）")
+        
+        # 多个GPU时数据并行训练（每个GPU各持一份模型副本，每批数据平分到各GPU，梯度汇总后同步更新）
+        if num_gpus > 1:
+            self.strategy = tf.distribute.MirroredStrategy()
+            print(f"✅ 使用 {num_gpus} 个GPU数据并行训练")
+        else:
+            self.strategy = tf.distribute.get_strategy()
+        
+        # CPU上float16没有加速，只在GPU上启用混合精度
+        self.mixed_precision = mixed_precision and self.use_gpu
     
     def build_tokenizer(self, texts: List[str]):
         """构建词汇表和分词器"""
@@ -64,21 +126,62 @@ class TensorFlowTextRewriter:
     
     def text_to_sequence(self, text: str, max_length: Optional[int] = None) -> List[int]:
         """将文本转换为序列"""
+        return self.texts_to_sequences([text], max_length)[0].tolist()
+    
+    def texts_to_sequences(self, texts: List[str], max_length: Optional[int] = None) -> np.ndarray:
+        """
+        批量将文本转换为序列：<START> + 字符ID + <END>，之后用 <PAD> 填充
+        
+        所有文本拼接后一次编码为码位数组，通过查找表一次取出全部字符ID，再按行写入预先分配的数组
+        
+        Args:
+            texts: 文本列表
+            max_length: 序列长度（默认为 self.max_length）
+        
+        Returns:
+            形状为 (len(texts), max_length) 的int32数组
+        """
         if max_length is None:
             max_length = self.max_length
         
-        sequence = [self.vocab.get('<START>', 1)]
-        for char in text[:max_length-2]:
-            sequence.append(self.vocab.get(char, self.vocab.get('<UNK>', 2)))
-        sequence.append(self.vocab.get('<END>', 3))
+        table = self._char_lookup()
+        sequences = np.full((len(texts), max_length), self.vocab.get('<PAD>', 0), dtype=np.int32)
+        if not len(texts):
+            return sequences
         
-        # 填充或截断
-        if len(sequence) < max_length:
-            sequence.extend([self.vocab.get('<PAD>', 0)] * (max_length - len(sequence)))
-        else:
-            sequence = sequence[:max_length]
+        truncated = [text[:max_length-2] for text in texts]
+        lengths = np.fromiter(map(len, truncated), dtype=np.int64, count=len(truncated))
+        codes = np.frombuffer(''.join(truncated).encode('utf-32-le'), dtype=np.uint32)
+        ids = np.where(codes < len(table), table[np.minimum(codes, len(table) - 1)], self.vocab.get('<UNK>', 2))
+        
+        # 每个字符所在的行，以及在行内的位置（<START> 之后）
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        cols = np.arange(len(codes)) - np.repeat(starts, lengths) + 1
+        
+        sequences[:, 0] = self.vocab.get('<START>', 1)
+        sequences[rows, cols] = ids
+        sequences[np.arange(len(texts)), lengths + 1] = self.vocab.get('<END>', 3)
+        
+        return sequences
+    
+    def _char_lookup(self) -> np.ndarray:
+        """
+        获取码位 -> 字符ID 的查找表（词汇表变化后重建）
+        
+        Returns:
+            以码位为下标的int32数组，不在词汇表中的字符对应 <UNK>
+        """
+        if self._char_table is not None and self._char_table[:2] == (id(self.vocab), len(self.vocab)):
+            return self._char_table[2]
+        
+        chars = [(ord(char), idx) for char, idx in self.vocab.items() if len(char) == 1]
+        table = np.full(max((code for code, _ in chars), default=0) + 1, self.vocab.get('<UNK>', 2), dtype=np.int32)
+        for code, idx in chars:
+            table[code] = idx
         
-        return sequence
+        self._char_table = (id(self.vocab), len(self.vocab), table)
+        return table
     
     def sequence_to_text(self, sequence: List[int]) -> str:
         """将序列转换为文本"""
@@ -104,11 +207,24 @@ class TensorFlowTextRewriter:
             num_layers: Transformer层数
             num_heads: 注意力头数
         """
+        # 模型变量需在分布策略的作用域内创建
+        # 精度策略在构建层时生效；混合精度下 compile 会自动用 LossScaleOptimizer 包装优化器
+        # 构建完成后恢复原来的全局策略，避免影响同一进程中之后构建的其他模型
+        previous_policy = tf.keras.mixed_precision.global_policy()
+        tf.keras.mixed_precision.set_global_policy('mixed_float16' if self.mixed_precision else 'float32')
+        try:
+            with self.strategy.scope():
+                self._build_model(style_embedding_dim, num_layers, num_heads)
+        finally:
+            tf.keras.mixed_precision.set_global_policy(previous_policy)
+    
+    def _build_model(self, style_embedding_dim: int, num_layers: int, num_heads: int):
+        """在当前分布策略下构建并编译模型"""
         print("🏗️  构建深度学习模型...")
         print(f"   配置: {num_layers}层, {num_heads}个注意力头, 嵌入维度{self.embedding_dim}")
         
-        # 输入层
-        input_text = layers.Input(shape=(self.max_length,), name='input_text')
+        # 输入层（序列长度可变，最长 max_length）
+        input_text = layers.Input(shape=(None,), name='input_text')
         input_style = layers.Input(shape=(1,), name='input_style', dtype='int32')
         
         # 文本嵌入（添加位置编码）
@@ -119,13 +235,12 @@ class TensorFlowTextRewriter:
             name='text_embedding'
         )(input_text)
         
-        # 位置编码（可学习的）
-        position_encoding = layers.Embedding(
+        # 位置编码（可学习的，按实际序列长度截取）
+        text_embedding = PositionEmbedding(
             self.max_length,
             self.embedding_dim,
             name='position_encoding'
-        )(tf.range(self.max_length))
-        text_embedding = text_embedding + position_encoding
+        )(text_embedding)
         
         # 风格嵌入
         style_embedding = layers.Embedding(
@@ -134,13 +249,12 @@ class TensorFlowTextRewriter:
             name='style_embedding'
         )(input_style)
         # Embedding输出形状: (batch_size, 1, style_embedding_dim)
-        # 需要先展平为 (batch_size, style_embedding_dim) 才能用RepeatVector
+        # 需要先展平为 (batch_size, style_embedding_dim) 再重复
         style_embedding_flat = layers.Flatten()(style_embedding)  # 展平为 (batch_size, style_embedding_dim)
         
-        # 扩展风格嵌入以匹配文本长度
-        # RepeatVector需要2维输入 (batch_size, features)，输出 (batch_size, timesteps, features)
-        style_embedding_expanded = layers.RepeatVector(self.max_length)(style_embedding_flat)
-        # 现在形状是 (batch_size, max_length, style_embedding_dim)，不需要Reshape了
+        # 扩展风格嵌入以匹配文本长度（序列长度可变，在计算时取文本嵌入的实际长度）
+        style_embedding_expanded = RepeatToLength()([style_embedding_flat, text_embedding])
+        # 现在形状是 (batch_size, 序列长度, style_embedding_dim)
         
         # 融合文本和风格嵌入
         combined = layers.Concatenate()([text_embedding, style_embedding_expanded])
@@ -171,8 +285,8 @@ class TensorFlowTextRewriter:
         # 全局池化（可选）
         # x = layers.GlobalAveragePooling1D()(x)
         
-        # 输出层
-        output = layers.Dense(self.vocab_size, activation='softmax', name='output')(x)
+        # 输出层输出logits（固定为float32，保证数值稳定）：损失函数直接从logits计算（融合log-softmax），推理时再做softmax
+        output = layers.Dense(self.vocab_size, dtype='float32', name='output')(x)
         
         # 构建模型
         self.model = models.Model(
@@ -181,15 +295,16 @@ class TensorFlowTextRewriter:
             name='text_rewriter'
         )
         
-        # 编译模型（使用更优化的学习率和指标）
+        # 编译模型（使用更优化的学习率和指标；XLA编译训练步骤，融合各层的逐元素运算和矩阵乘法）
         self.model.compile(
             optimizer=optimizers.Adam(learning_rate=0.001, beta_1=0.9, beta_2=0.999),
-            loss='sparse_categorical_crossentropy',
+            loss=keras.losses.SparseCategoricalCrossentropy(from_logits=True),
             metrics=[
                 'accuracy', 
                 'sparse_top_k_categorical_accuracy',
-                'sparse_categorical_crossentropy'  # 添加交叉熵作为指标
-            ]
+                keras.metrics.SparseCategoricalCrossentropy(from_logits=True)  # 添加交叉熵作为指标
+            ],
+            jit_compile=True
         )
         
         print("✅ 模型构建完成")
@@ -198,6 +313,8 @@ class TensorFlowTextRewriter:
         # 显示模型结构摘要
         if self.use_gpu:
             print("   GPU加速: 已启用")
+        if self.mixed_precision:
+            print("   混合精度: 已启用")
     
     def prepare_training_data(self, original_texts: List[str], rewritten_texts: List[str], styles: List[int], 
                               augment: bool = False):
@@ -212,9 +329,9 @@ class TensorFlowTextRewriter:
         """
         print("📊 准备训练数据...")
         
-        X_text = []
+        inputs = []
         X_style = []
-        y = []
+        targets = []
         
         for orig, rew, style in zip(original_texts, rewritten_texts, styles):
             # 数据增强（可选）
@@ -224,25 +341,74 @@ class TensorFlowTextRewriter:
                     start = np.random.randint(0, len(orig) - self.max_length + 1)
                     orig = orig[start:start + self.max_length]
             
-            orig_seq = self.text_to_sequence(orig)
-            rew_seq = self.text_to_sequence(rew)
-            
-            X_text.append(orig_seq)
+            inputs.append(orig)
             X_style.append([style])
-            
-            # 为每个位置创建标签（下一个字符）
-            y_seq = rew_seq[1:] + [self.vocab.get('<PAD>', 0)]
-            y.append(y_seq)
+            targets.append(rew)
         
         # 转换为numpy数组
-        X_text = np.array(X_text)
+        X_text = self.texts_to_sequences(inputs)
         X_style = np.array(X_style)
-        y = np.array(y)
+        
+        # 为每个位置创建标签（下一个字符）
+        y = np.empty_like(X_text)
+        y[:, :-1] = self.texts_to_sequences(targets)[:, 1:]
+        y[:, -1] = self.vocab.get('<PAD>', 0)
         
         print(f"   数据形状: X_text={X_text.shape}, X_style={X_style.shape}, y={y.shape}")
         
         return X_text, X_style, y
     
+    def make_dataset(self, X_text: np.ndarray, X_style: np.ndarray, y: np.ndarray, batch_size: int,
+                     shuffle: bool = False) -> tf.data.Dataset:
+        """
+        构建训练/验证用的输入管道
+        
+        数据已在内存中完成分词，缓存后每轮只需打乱和分批，prefetch 让下一批的准备与当前训练步骤重叠；
+        样本按实际长度分桶成批，每批截掉末尾多余的 <PAD>，短样本不再按 max_length 计算
+        
+        Args:
+            X_text: 文本序列
+            X_style: 风格ID
+            y: 标签序列
+            batch_size: 批次大小
+            shuffle: 是否每轮打乱（训练集）
+        
+        Returns:
+            产生 ((文本, 风格), 标签) 批次的数据集
+        """
+        # 每个样本的实际长度：输入或标签中最后一个非 <PAD> 位置之后
+        pad_idx = self.vocab.get('<PAD>', 0)
+        not_pad = (X_text != pad_idx) | (y != pad_idx)
+        lengths = (X_text.shape[1] - np.argmax(not_pad[:, ::-1], axis=1)).astype(np.int32)
+        
+        widths = self._bucket_widths()
+        widths_tensor = tf.constant(widths, dtype=tf.int32)
+        
+        def trim(inputs, labels, length):
+            text, style = inputs
+            width = tf.gather(widths_tensor, tf.searchsorted(widths_tensor, [tf.reduce_max(length)]))[0]
+            return (text[:, :width], style), labels[:, :width]
+        
+        ds = tf.data.Dataset.from_tensor_slices(((X_text, X_style), y, lengths)).cache()
+        if shuffle:
+            ds = ds.shuffle(min(len(y), 8192))
+        ds = ds.bucket_by_sequence_length(
+            element_length_func=lambda inputs, labels, length: length,
+            bucket_boundaries=[width + 1 for width in widths[:-1]],
+            bucket_batch_sizes=[batch_size] * len(widths),
+            no_padding=True
+        )
+        return ds.map(trim, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+    
+    def _bucket_widths(self) -> List[int]:
+        """
+        序列可截短到的宽度
+        
+        Returns:
+            从小到大的宽度列表，最后一项为 max_length
+        """
+        return [width for width in _LENGTH_BUCKETS if width < self.max_length] + [self.max_length]
+    
     def train(self, original_texts: List[str], rewritten_texts: List[str], styles: List[int], 
               epochs: int = 10, batch_size: int = 32, validation_split: float = 0.2,
               validation_data: Tuple[List[str], List[str], List[int]] = None,
@@ -264,25 +430,32 @@ class TensorFlowTextRewriter:
         if learning_rate is not None:
             self.model.compile(
                 optimizer=optimizers.Adam(learning_rate=learning_rate, beta_1=0.9, beta_2=0.999),
-                loss='sparse_categorical_crossentropy',
+                loss=keras.losses.SparseCategoricalCrossentropy(from_logits=True),
                 metrics=[
                     'accuracy', 
                     'sparse_top_k_categorical_accuracy',
-                    'sparse_categorical_crossentropy'
-                ]
+                    keras.metrics.SparseCategoricalCrossentropy(from_logits=True)
+                ],
+                jit_compile=True
             )
         print("🚀 开始训练模型...")
         
         # 准备数据
         X_text, X_style, y = self.prepare_training_data(original_texts, rewritten_texts, styles, augment=True)
         
-        # 准备验证数据
-        val_data = None
+        # 准备验证数据（未提供独立验证集时，与 validation_split 相同取末尾部分样本）
         if validation_data:
             val_orig, val_rew, val_styles = validation_data
             val_X_text, val_X_style, val_y = self.prepare_training_data(val_orig, val_rew, val_styles, augment=False)
-            val_data = ([val_X_text, val_X_style], val_y)
             print(f"   使用独立验证集: {len(val_orig)} 条样本")
+        else:
+            num_train = len(y) - int(len(y) * validation_split)
+            X_text, val_X_text = X_text[:num_train], X_text[num_train:]
+            X_style, val_X_style = X_style[:num_train], X_style[num_train:]
+            y, val_y = y[:num_train], y[num_train:]
+        
+        train_ds = self.make_dataset(X_text, X_style, y, batch_size, shuffle=True)
+        val_ds = self.make_dataset(val_X_text, val_X_style, val_y, batch_size) if len(val_y) else None
         
         # 创建保存目录
         os.makedirs(self.model_path, exist_ok=True)
@@ -317,22 +490,12 @@ class TensorFlowTextRewriter:
         ]
         
         # 训练
-        fit_kwargs = {
-            'epochs': epochs,
-            'batch_size': batch_size,
-            'callbacks': callbacks_list,
-            'verbose': 1
-        }
-        
-        if val_data:
-            fit_kwargs['validation_data'] = val_data
-        else:
-            fit_kwargs['validation_split'] = validation_split
-        
         history = self.model.fit(
-            [X_text, X_style],
-            y,
-            **fit_kwargs
+            train_ds,
+            epochs=epochs,
+            validation_data=val_ds,
+            callbacks=callbacks_list,
+            verbose=1
         )
         
         # 保存模型
@@ -381,7 +544,12 @@ class TensorFlowTextRewriter:
         if os.path.exists(model_file):
             if not self.model:
                 self.build_model()
-            self.model.load_weights(model_file)
+            try:
+                self.model.load_weights(model_file)
+            except ValueError:
+                # 早期版本的位置编码未作为模型的层保存，权重文件中没有这一层：
+                # 其余各层按层名加载，位置编码保持初始值
+                self.model.load_weights(model_file, by_name=True)
             print("✅ 模型加载完成")
             return True
         return False
@@ -399,92 +567,142 @@ class TensorFlowTextRewriter:
         Returns:
             改写后的文本
         """
+        return self.rewrite_batch([text], [style], temperature=temperature, max_length=max_length)[0]
+    
+    def rewrite_batch(self, texts: List[str], styles: List[int], temperature: float = 0.7,
+                      max_length: Optional[int] = None, batch_size: int = 16) -> List[str]:
+        """
+        批量改写文本（同一批的文本逐步同时生成，每一步只运行一次模型）
+        
+        Args:
+            texts: 原始文本列表
+            styles: 与texts一一对应的风格ID列表
+            temperature: 采样温度（0.1-1.0，越小越确定，越大越随机）
+            max_length: 最大生成长度（默认为各文本长度的2倍）
+            batch_size: 每批同时生成的文本数（模型每步输出 batch_size × 序列长度 × 词表大小 的logits）
+        
+        Returns:
+            与texts一一对应的改写结果
+        """
         if not self.model:
             if not self.load_model():
                 raise ValueError("模型未训练或未加载，请先训练模型")
         
-        if max_length is None:
-            max_length = min(len(text) * 2, self.max_length)
+        results = []
+        for start in range(0, len(texts), batch_size):
+            results.extend(self._generate_batch(
+                texts[start:start + batch_size], styles[start:start + batch_size], temperature, max_length
+            ))
+        return results
+    
+    def _generate_batch(self, texts: List[str], styles: List[int], temperature: float,
+                        max_length: Optional[int]) -> List[str]:
+        """
+        逐步生成一批文本的改写结果
         
-        # 准备输入
-        input_seq = self.text_to_sequence(text)
-        input_text = np.array([input_seq])
-        input_style = np.array([[style]])
+        Args:
+            texts: 原始文本列表
+            styles: 风格ID列表
+            temperature: 采样温度
+            max_length: 最大生成长度（为None时取各文本长度的2倍）
         
-        # 生成改写文本（使用贪心解码或采样）
-        output_seq = []
-        current_seq = input_seq.copy()
+        Returns:
+            改写结果列表
+        """
+        end_idx = self.vocab.get('<END>', 3)
+        pad_idx = self.vocab.get('<PAD>', 0)
+        
+        # 每一步在下一个位置生成一个字符，生成长度不超过 max_length
+        limits = np.minimum([
+            max_length if max_length is not None else len(text) * 2
+            for text in texts
+        ], self.max_length)
+        
+        # 准备输入（每行在生成过程中被逐位改写，作为下一步的输入）
+        # 只保留容纳原文和全部生成位置所需的宽度（取分桶宽度），之后全是 <PAD>，在注意力中被屏蔽
+        needed = max(int(limits.max(initial=0)) + 1, max(len(text) for text in texts) + 2)
+        width = next((width for width in self._bucket_widths() if width >= needed), self.max_length)
+        input_text = np.ascontiguousarray(self.texts_to_sequences(texts)[:, :width])
+        input_style = np.array(styles, dtype=np.int32).reshape(-1, 1)
+        active = np.ones(len(texts), dtype=bool)
+        output_seqs = [[] for _ in texts]
         
         try:
-            for step in range(max_length):
-                # 预测下一个字符
-                predictions = self.model.predict([input_text, input_style], verbose=0, batch_size=1)
-                
-                if step >= predictions.shape[1]:
+            for step in range(int(limits.max(initial=0))):
+                active &= limits > step
+                rows = np.flatnonzero(active)
+                if not len(rows):
                     break
                 
-                next_char_probs = predictions[0, step, :]
-                
-                # 应用改进的采样策略（Top-k + Nucleus采样）
-                if temperature > 0:
-                    # Top-k采样（选择概率最高的k个字符）
-                    top_k = 50
-                    top_k_indices = np.argsort(next_char_probs)[-top_k:]
-                    top_k_probs = next_char_probs[top_k_indices]
-                    
-                    # 应用温度
-                    top_k_probs = np.log(top_k_probs + 1e-10) / temperature
-                    top_k_probs = np.exp(top_k_probs)
-                    top_k_probs = top_k_probs / np.sum(top_k_probs)
-                    
-                    # Nucleus采样（可选，累积概率阈值）
-                    nucleus_threshold = 0.9
-                    if nucleus_threshold < 1.0:
-                        sorted_probs = np.sort(top_k_probs)[::-1]
-                        cumsum_probs = np.cumsum(sorted_probs)
-                        cutoff = np.searchsorted(cumsum_probs, nucleus_threshold)
-                        if cutoff < len(top_k_probs):
-                            top_k_probs = top_k_probs[:cutoff+1]
-                            top_k_probs = top_k_probs / np.sum(top_k_probs)
-                            top_k_indices = top_k_indices[:cutoff+1]
-                    
-                    next_char_idx = np.random.choice(top_k_indices, p=top_k_probs)
-                else:
-                    # 贪心解码
-                    next_char_idx = np.argmax(next_char_probs)
-                
-                # 检查结束标记
-                if next_char_idx == self.vocab.get('<END>', 3):
-                    break
+                # 只运行仍在生成的行；采样在图中完成，只把选出的字符ID复制回内存
+                next_char_ids = self._step_sampler()(input_text[rows], input_style[rows], step, temperature).numpy()
                 
-                # 跳过填充标记
-                if next_char_idx != self.vocab.get('<PAD>', 0):
-                    output_seq.append(int(next_char_idx))
+                for next_char_idx, row in zip(next_char_ids.tolist(), rows):
+                    # 检查结束标记
+                    if next_char_idx == end_idx:
+                        active[row] = False
+                        continue
                     
-                    # 更新输入序列（用于下一步预测）
-                    if step + 1 < len(current_seq):
-                        current_seq[step + 1] = int(next_char_idx)
-                    else:
-                        # 如果超出当前序列长度，需要扩展
-                        current_seq = np.append(current_seq, int(next_char_idx))
-                        if len(current_seq) > self.max_length:
-                            current_seq = current_seq[:self.max_length]
-                    
-                    input_text = np.array([current_seq])
+                    # 跳过填充标记
+                    if next_char_idx != pad_idx:
+                        output_seqs[row].append(int(next_char_idx))
+                        # 更新输入序列（用于下一步预测）
+                        if step + 1 < input_text.shape[1]:
+                            input_text[row, step + 1] = next_char_idx
         
         except Exception as e:
             print(f"⚠️  生成过程中出错: {e}")
-            # 如果生成失败，返回原始文本的简单处理
-            return text
-        
-        # 转换为文本
-        result = self.sequence_to_text(output_seq)
+            # 如果生成失败，返回原始文本
+            return list(texts)
+        
+        results = []
+        for text, output_seq in zip(texts, output_seqs):
+            result = self.sequence_to_text(output_seq)
+            # 如果结果为空或太短，返回原始文本
+            results.append(text if not result or len(result) < len(text) * 0.3 else result)
+        return results
+    
+    def _step_sampler(self):
+        """
+        获取为某一位置选出下一个字符的函数（模型前向和采样在同一个图中完成）
         
-        # 如果结果为空或太短，返回原始文本
-        if not result or len(result) < len(text) * 0.3:
-            return text
+        采样策略：Top-k（k=50）+ 温度 + Nucleus（累积概率0.9）；温度不大于0时贪心解码
+        批次和序列宽度均可变，图只需追踪一次，之后每一步直接执行；模型重建后重新创建
         
-        return result
+        Returns:
+            f(input_text, input_style, step, temperature) -> 形状为 (批次,) 的字符ID
+        """
+        if self._step_fn is None or self._step_fn[0] is not self.model:
+            model = self.model
+            
+            @tf.function(input_signature=[
+                tf.TensorSpec((None, None), tf.int32),
+                tf.TensorSpec((None, 1), tf.int32),
+                tf.TensorSpec((), tf.int32),
+                tf.TensorSpec((), tf.float32),
+            ])
+            def sample_step(input_text, input_style, step, temperature):
+                logits = model([input_text, input_style], training=False)[:, step, :]
+                
+                def sample():
+                    # Top-k采样（选择概率最高的k个字符，按概率从高到低排列）并应用温度
+                    top_k_logits, top_k_indices = tf.math.top_k(logits, k=tf.minimum(50, tf.shape(logits)[-1]))
+                    top_k_logits = top_k_logits / temperature
+                    
+                    # Nucleus采样：保留累积概率达到阈值之前的字符（含跨过阈值的那一个）
+                    probs = tf.nn.softmax(top_k_logits)
+                    kept = tf.cumsum(probs, axis=-1, exclusive=True) < 0.9
+                    top_k_logits = tf.where(kept, top_k_logits, tf.fill(tf.shape(top_k_logits), -np.inf))
+                    
+                    choice = tf.random.categorical(top_k_logits, 1, dtype=tf.int32)
+                    return tf.gather(top_k_indices, choice, batch_dims=1)[:, 0]
+                
+                # 贪心解码
+                greedy = lambda: tf.argmax(logits, axis=-1, output_type=tf.int32)
+                return tf.cond(temperature > 0, sample, greedy)
+            
+            self._step_fn = (model, sample_step)
+        return self._step_fn[1]
 
 
 class TensorFlowAnalyzer:
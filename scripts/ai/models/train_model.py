@@ -6,7 +6,6 @@
 
 import os
 import sys
-import json
 from typing import List, Tuple
 import sys
 import os
@@ -33,7 +32,8 @@ def prepare_training_data(data_file: str) -> Tuple[List[str], List[str], List[in
                     continue
                 
                 # 支持TSV格式：原始文本<TAB>改写文本<TAB>风格ID<TAB>上下文JSON（可选）
-                parts = line.split('\t')
+                # 只需前四列，不再切分之后的内容
+                parts = line.split('\t', 4)
                 if len(parts) >= 3:
                     try:
                         # 数据验证：检查原始文本和改写文本长度
@@ -51,18 +51,10 @@ def prepare_training_data(data_file: str) -> Tuple[List[str], List[str], List[in
                                 print(f"   ⚠️  第{line_num}行风格ID无效: {style_id}")
                             continue
                         
-                        # 解析上下文信息（如果存在）
-                        context_info = {}
-                        if len(parts) >= 4:
-                            try:
-                                context_info = json.loads(parts[3])
-                            except json.JSONDecodeError:
-                                pass  # 上下文解析失败不影响主数据
-                        
                         # 数据验证通过，添加到训练数据
                         orig = parts[0].strip()
                         rew = parts[1].strip()
-                        style = int(parts[2].strip())
+                        style = style_id
                         context = parts[3].strip() if len(parts) >= 4 else ""  # 可选的上下文
                         
                         # 验证数据（提高最小长度要求）
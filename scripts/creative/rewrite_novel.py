@@ -16,6 +16,7 @@ import re
 import sys
 import json
 import random
+import asyncio
 from typing import Dict, List, Optional, Set, Tuple
 from collections import Counter, defaultdict
 
@@ -617,6 +618,8 @@ class NovelRewriter:
                     summary = self.analyzer.generate_summary()
                     context_summary = f"故事主题：{summary.get('story_arc', '')}，主要人物：{', '.join(summary.get('main_characters', [])[:5])}"
                 
+                chunks = []
+                contexts = []
                 for i in range(0, len(self.content), chunk_size):
                     # 获取当前块
                     chunk = self.content[i:i+chunk_size]
@@ -638,16 +641,26 @@ class NovelRewriter:
                     if context_summary:
                         full_context = f"{context_summary}\n\n{full_context}"
                     
-                    # 使用AI改写（传入上下文）
-                    rewritten_chunk = self.ai_analyzer.rewrite_text(
-                        chunk, 
-                        style, 
-                        context=full_context
+                    chunks.append(chunk)
+                    contexts.append(full_context)
+                
+                if hasattr(self.ai_analyzer, 'rewrite_text_batch'):
+                    # 支持并发的分析器：所有块一次性并发改写
+                    print(f"   🤖 AI并发处理 {total_chunks} 个文本块...")
+                    result_parts = asyncio.run(
+                        self.ai_analyzer.rewrite_text_batch(chunks, style, contexts=contexts)
                     )
-                    
-                    result_parts.append(rewritten_chunk)
-                    current_chunk = (i // chunk_size) + 1
-                    print(f"   🤖 AI处理进度: {current_chunk}/{total_chunks} ({current_chunk*100//total_chunks}%)")
+                else:
+                    for current_chunk, (chunk, full_context) in enumerate(zip(chunks, contexts), 1):
+                        # 使用AI改写（传入上下文）
+                        rewritten_chunk = self.ai_analyzer.rewrite_text(
+                            chunk, 
+                            style, 
+                            context=full_context
+                        )
+                        
+                        result_parts.append(rewritten_chunk)
+                        print(f"   🤖 AI处理进度: {current_chunk}/{total_chunks} ({current_chunk*100//total_chunks}%)")
                 
                 result = ''.join(result_parts)
                 print(f"✅ 深度学习AI风格转换完成: {style}")
@@ -1033,6 +1046,8 @@ def main():
         print("  --ai-model=gpt-4                  # AI模型名称（仅openai，推荐gpt-4）")
         print("  --ai-model-path=models/text_rewriter  # TensorFlow模型路径（仅tensorflow）")
         print("  --ai-base-url=http://localhost:11434  # 本地LLM服务地址（仅local）")
+        print("  --ai-batch                        # 通过Batch API批量改写（仅openai，费用减半，适合离线任务）")
+        print("  --ai-quantization=int8/int4/awq/gptq  # 模型量化方式（仅huggingface）")
         print("\n示例:")
         print("  # 传统方法")
         print("  python3 rewrite_novel.py novel.txt --perspective=第三人称 --style=简洁")
@@ -1076,6 +1091,10 @@ def main():
             ai_kwargs['model_path'] = arg.split('=')[1]
         elif arg.startswith('--ai-base-url='):
             ai_kwargs['base_url'] = arg.split('=')[1]
+        elif arg == '--ai-batch':
+            ai_kwargs['batch_mode'] = True
+        elif arg.startswith('--ai-quantization='):
+            ai_kwargs['quantization'] = arg.split('=')[1]
         elif arg.startswith('--output-dir='):
             output_dir = arg.split('=')[1]
         elif not arg.startswith('--'):